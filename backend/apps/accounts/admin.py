@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
-from .models import LoginHistory, SecurityEvent, User
+from .models import LoginHistory, OutboundEmail, SecurityEvent, User
 
 
 @admin.register(User)
@@ -51,10 +51,6 @@ class UserAdmin(BaseUserAdmin):
     readonly_fields = [
         "last_login",
         "date_joined",
-        "verification_token",
-        "verification_token_created",
-        "password_reset_token",
-        "password_reset_token_created",
         "failed_login_attempts",
         "last_failed_login",
         "account_locked_until",
@@ -86,8 +82,6 @@ class UserAdmin(BaseUserAdmin):
             {
                 "fields": (
                     "email_verified",
-                    "verification_token",
-                    "verification_token_created",
                 )
             },
         ),
@@ -106,16 +100,6 @@ class UserAdmin(BaseUserAdmin):
                 "classes": ("collapse",),
             },
         ),
-        (
-            "Password Reset",
-            {
-                "fields": (
-                    "password_reset_token",
-                    "password_reset_token_created",
-                ),
-                "classes": ("collapse",),
-            },
-        ),
         (
             "Permissions",
             {
@@ -178,20 +162,19 @@ class UserAdmin(BaseUserAdmin):
         """Display security information summary"""
         from django.utils import timezone
 
-        recent_logins = obj.login_history.filter(
-            timestamp__gte=timezone.now() - timezone.timedelta(days=30)
-        ).count()
+        since = timezone.now() - timezone.timedelta(days=30)
+        recent_logins = obj.login_history.filter(success=True, timestamp__gte=since).count()
+        recent_failures = obj.login_history.filter(success=False, timestamp__gte=since).count()
 
-        recent_events = obj.security_events.filter(
-            timestamp__gte=timezone.now() - timezone.timedelta(days=30)
-        ).count()
+        recent_events = obj.security_events.filter(timestamp__gte=since).count()
 
         html = f"""
         <div style="background: #f4f3f0; padding: 15px; border-radius: 8px;">
             <h4 style="margin-top: 0;">Security Overview (Last 30 Days)</h4>
             <ul style="list-style: none; padding-left: 0;">
-                <li>📊 Total Logins: {recent_logins}</li>
+                <li>📊 Successful Logins: {recent_logins}</li>
                 <li>🔒 Security Events: {recent_events}</li>
+                <li>❌ Failed Logins: {recent_failures}</li>
                 <li>⚠️ Failed Attempts: {obj.failed_login_attempts}</li>
             </ul>
             <p style="margin-bottom: 0;">
@@ -371,3 +354,49 @@ class SecurityEventAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Allow deletion for cleanup
         return request.user.is_superuser
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Admin interface for the email outbox"""
+
+    list_display = [
+        "recipient",
+        "subject",
+        "status",
+        "attempts",
+        "created_at",
+        "sent_at",
+        "next_attempt_at",
+    ]
+
+    list_filter = [
+        "status",
+        "created_at",
+    ]
+
+    search_fields = [
+        "recipient",
+        "subject",
+    ]
+
+    readonly_fields = [
+        "id",
+        "recipient",
+        "subject",
+        "body",
+        "html_body",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+        "created_at",
+        "sent_at",
+    ]
+
+    ordering = ["-created_at"]
+    date_hierarchy = "created_at"
+
+    def has_add_permission(self, request):
+        # Messages are only created by the application
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.apps.accounts"
+
+    def ready(self):
+        # Connects the signals that bump per-user cache versions
+        from . import user_cache  # noqa: F401
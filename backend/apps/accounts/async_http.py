@@ -0,0 +1,31 @@
+"""
+Shared ``httpx.AsyncClient`` instances for the async views.
+
+An async client's connection pool belongs to the event loop it was first used
+on. Under uvicorn each worker runs one loop for its lifetime, so clients are
+kept per loop: one long-lived pool per upstream per worker, while the
+short-lived loops the dev server creates for each async request get their own
+and are dropped with them.
+"""
+import asyncio
+import weakref
+from collections.abc import Callable
+from typing import Any, TypeVar, cast
+
+T = TypeVar("T")
+
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, Any]] = weakref.WeakKeyDictionary()
+
+
+def get_async_client(name: str, factory: Callable[[], T]) -> T:
+    """
+    Return the running loop's client called ``name``, creating it with ``factory``.
+
+    ``factory`` may build an ``httpx.AsyncClient`` or a wrapper around one; a
+    name is always used with the same factory.
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(name)
+    if client is None:
+        client = clients[name] = factory()
+    return cast(T, client)
@@ -0,0 +1,156 @@
+"""
+Buffered writer for LoginHistory and SecurityEvent records.
+
+Audit rows are append-only and nothing reads them back within the request
+that creates them, so instead of one INSERT and commit per event they are
+collected in a per-process buffer and written with ``bulk_create`` once the
+buffer reaches ``AUDIT_BUFFER_SIZE`` events or its oldest event is
+``AUDIT_FLUSH_INTERVAL`` seconds old. An event added inside a transaction
+joins the buffer only once that transaction commits, and is dropped with it
+on rollback, just as an inline INSERT would be; the buffer is never flushed
+as part of the caller's transaction. A daemon thread enforces the time
+threshold, and the buffer is flushed at interpreter exit, gunicorn worker
+exit and Celery worker shutdown. A hard-killed worker loses at most one
+buffer's worth of events.
+
+With ``AUDIT_BUFFER_ENABLED = False`` (the DEBUG default) every event is
+written synchronously, as is any batch whose ``bulk_create`` fails.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import Model
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    """Per-process buffer of unsaved audit model instances."""
+
+    def __init__(self, enabled: bool, max_size: int, flush_interval: float):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+
+        self._pending: list[Model] = []
+        self._oldest: float | None = None
+        self._lock = threading.RLock()
+        self._pid: int | None = None
+        self._timer: threading.Thread | None = None
+
+    def add(self, instance):
+        """Record a new audit instance; returns it so callers can keep a reference."""
+        if not self.enabled:
+            instance.save(force_insert=True)
+            return instance
+
+        if connection.in_atomic_block:
+            # Buffer the event only if the caller's transaction commits. On
+            # rollback, of the transaction or of the savepoint it was added
+            # in, Django discards the callback and the event with it
+            transaction.on_commit(partial(self._enqueue, instance))
+        else:
+            self._enqueue(instance)
+        return instance
+
+    def _enqueue(self, instance) -> None:
+        with self._lock:
+            self._ensure_process()
+            self._pending.append(instance)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._pending) >= self.max_size
+
+        if full:
+            if connection.in_atomic_block:
+                # Other requests' events must not share an open transaction:
+                # a failed bulk insert would break it. Flush after it commits;
+                # if it rolls back, the events stay buffered for the timer
+                transaction.on_commit(self.flush)
+            else:
+                self.flush()
+
+    def save(self, instance, update_fields: list[str]):
+        """
+        Persist changes to an audit instance that may still be buffered.
+
+        Callers change the instance first; an instance not written yet, whether
+        buffered or waiting for its transaction to commit, is then written with
+        those values on flush, otherwise it is updated in place.
+        """
+        with self._lock:
+            if instance._state.adding:
+                return
+            instance.save(update_fields=update_fields)
+
+    def flush(self) -> int:
+        """Write every buffered instance; returns the number written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._oldest = None
+
+            by_model = defaultdict(list)
+            for instance in pending:
+                by_model[type(instance)].append(instance)
+
+            written = 0
+            for model, instances in by_model.items():
+                try:
+                    model.objects.bulk_create(instances)
+                    written += len(instances)
+                except DatabaseError as e:
+                    logger.warning(f"Bulk audit write of {len(instances)} {model.__name__} failed, saving one by one: {e}")
+                    written += self._save_individually(instances)
+
+            return written
+
+    def _save_individually(self, instances) -> int:
+        written = 0
+        for instance in instances:
+            try:
+                instance.save(force_insert=True)
+                written += 1
+            except DatabaseError as e:
+                logger.error(f"Dropping {type(instance).__name__} {instance.pk}: {e}")
+        return written
+
+    def _ensure_process(self):
+        """Reset state inherited across fork and start this process's flush thread."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        self._pid = pid
+        self._pending, self._oldest = [], None
+        self._timer = threading.Thread(target=self._run_timer, name="audit-flush", daemon=True)
+        self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval / 2)
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval
+            if not due:
+                continue
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Timed audit flush failed: {e}")
+            finally:
+                # This thread owns its own connections; don't hold them between flushes
+                connections.close_all()
+
+
+audit_log = AuditBuffer(
+    enabled=getattr(settings, "AUDIT_BUFFER_ENABLED", False),
+    max_size=getattr(settings, "AUDIT_BUFFER_SIZE", 100),
+    flush_interval=getattr(settings, "AUDIT_FLUSH_INTERVAL", 2.0),
+)
+atexit.register(audit_log.flush)
@@ -0,0 +1,194 @@
+"""
+Client for the BankID Relying Party API (v6).
+
+Every call to the RP API is authenticated with our client certificate. The
+PEM files are loaded into a single ``SSLContext`` per process, and the async
+views share one pooled keep-alive httpx client per event loop (see
+async_http), so only the first request on each pooled connection performs the
+mutual-TLS handshake. Collect polls after that cost a single request round
+trip. Each worker opens its first connection at start-up
+(``warm_async_bankid_client``, called from the ASGI lifespan in
+``backend/config/asgi.py``), so even the first order finds one ready.
+
+Docs: https://developers.bankid.com/api-references/auth-sign
+"""
+import base64
+import logging
+import os
+import ssl
+import threading
+from typing import Any, Literal, NotRequired, TypedDict, cast
+
+import httpx
+from django.conf import settings
+
+from .async_http import get_async_client
+
+logger = logging.getLogger(__name__)
+
+
+class OrderResponse(TypedDict):
+    orderRef: str
+    autoStartToken: str
+    qrStartToken: str
+    qrStartSecret: str
+
+
+class CompletionUser(TypedDict):
+    personalNumber: str
+    name: str
+    givenName: str
+    surname: str
+
+
+class CompletionData(TypedDict):
+    user: CompletionUser
+    device: dict[str, Any]
+    bankIdIssueDate: str
+    signature: str
+    ocspResponse: str
+
+
+class CollectResponse(TypedDict):
+    orderRef: str
+    status: Literal["pending", "failed", "complete"]
+    hintCode: NotRequired[str]
+    completionData: NotRequired[CompletionData]
+
+
+class BankIDError(httpx.HTTPStatusError):
+    """An error response from the RP API, e.g. ``alreadyInProgress`` or ``invalidParameters``."""
+
+    def __init__(self, error_code: str, details: str, response: httpx.Response):
+        super().__init__(f"BankID {error_code}: {details}", request=response.request, response=response)
+        self.error_code = error_code
+        self.details = details
+
+
+# Transport-level failures and error responses, BankIDError included
+CLIENT_ERRORS = (httpx.HTTPError,)
+
+
+def _order_payload(end_user_ip: str, personal_number: str | None, **extra: Any) -> dict[str, Any]:
+    payload = {"endUserIp": end_user_ip, **extra}
+    if personal_number:
+        payload.setdefault("requirement", {})["personalNumber"] = personal_number
+    return payload
+
+
+def _raise_for_error(response: httpx.Response) -> None:
+    """Raise BankIDError for error responses that carry a BankID errorCode."""
+    try:
+        body = response.json()
+    except ValueError:
+        return
+    if isinstance(body, dict) and "errorCode" in body:
+        raise BankIDError(body["errorCode"], body.get("details", ""), response=response)
+
+
+def build_ssl_context(cert_path: str, key_path: str, ca_path: str) -> ssl.SSLContext:
+    """Client-certificate TLS context that only trusts the BankID CA."""
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=ca_path)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class AsyncBankIDClient:
+    """Thin typed wrapper over the RP API endpoints on a pooled mutual-TLS httpx client."""
+
+    def __init__(self, base_url: str, ssl_context: ssl.SSLContext, pool_size: int = 10,
+                 timeout: float | tuple[float, float] = (3, 10), keepalive_expiry: float = 60):
+        self.base_url = base_url.rstrip("/")
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        self.client = httpx.AsyncClient(
+            verify=ssl_context,
+            # httpx's default of 5s would drop a warmed connection before most workers see their first order
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+
+    async def auth(self, end_user_ip: str, personal_number: str | None = None, **extra: Any) -> OrderResponse:
+        """Start an authentication order."""
+        return cast(OrderResponse, await self._post("auth", _order_payload(end_user_ip, personal_number, **extra)))
+
+    async def sign(
+        self,
+        end_user_ip: str,
+        user_visible_data: str,
+        personal_number: str | None = None,
+        **extra: Any,
+    ) -> OrderResponse:
+        """Start a signing order; ``user_visible_data`` is plain text and is encoded here."""
+        user_visible_data = base64.b64encode(user_visible_data.encode()).decode()
+        payload = _order_payload(end_user_ip, personal_number, userVisibleData=user_visible_data, **extra)
+        return cast(OrderResponse, await self._post("sign", payload))
+
+    async def collect(self, order_ref: str) -> CollectResponse:
+        """Current status of an order."""
+        return cast(CollectResponse, await self._post("collect", {"orderRef": order_ref}))
+
+    async def cancel(self, order_ref: str) -> None:
+        """Cancel an outstanding order."""
+        await self._post("cancel", {"orderRef": order_ref})
+
+    async def warm(self) -> None:
+        """Open and handshake one pooled connection ahead of the first order."""
+        # Any response keeps the connection; GET on the base URL starts no order
+        await self.client.get(self.base_url)
+
+    async def _post(self, endpoint: str, payload: dict[str, Any]) -> dict[str, Any]:
+        response = await self.client.post(f"{self.base_url}/{endpoint}", json=payload)
+
+        if response.status_code >= 400:
+            _raise_for_error(response)
+            response.raise_for_status()
+
+        return response.json()
+
+
+_ssl_context: ssl.SSLContext | None = None
+_ssl_context_pid: int | None = None
+_ssl_context_lock = threading.Lock()
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """The process's client-certificate context for the async clients."""
+    global _ssl_context, _ssl_context_pid
+
+    pid = os.getpid()
+    if _ssl_context is None or _ssl_context_pid != pid:
+        with _ssl_context_lock:
+            if _ssl_context is None or _ssl_context_pid != pid:
+                _ssl_context = build_ssl_context(
+                    settings.BANKID_CERT_PATH,
+                    settings.BANKID_KEY_PATH,
+                    settings.BANKID_CA_CERT_PATH,
+                )
+                _ssl_context_pid = pid
+    return _ssl_context
+
+
+def get_async_bankid_client() -> AsyncBankIDClient:
+    """Return the running event loop's async client."""
+    return get_async_client("bankid", lambda: AsyncBankIDClient(
+        settings.BANKID_API_URL,
+        get_ssl_context(),
+        pool_size=getattr(settings, "BANKID_POOL_SIZE", 10),
+        timeout=getattr(settings, "BANKID_TIMEOUT", (3, 10)),
+        keepalive_expiry=getattr(settings, "BANKID_KEEPALIVE_EXPIRY", 60),
+    ))
+
+
+async def warm_async_bankid_client() -> bool:
+    """Build the loop's client and open its first connection; safe to call when BankID isn't configured."""
+    try:
+        await get_async_bankid_client().warm()
+    except (OSError, ssl.SSLError, httpx.HTTPError) as e:
+        logger.warning(f"Could not pre-warm BankID connection: {e}")
+        return False
+    return True
@@ -0,0 +1,103 @@
+"""
+Shared collect state for BankID orders.
+
+BankID asks relying parties to call ``/collect`` about every two seconds per
+order. Rather than letting every browser request (several tabs, an
+aggressive poller, the status stream) make its own upstream call, the latest
+result for each order is kept with the order in the registry (bankid_orders)
+and refreshed by at most one caller per ``COLLECT_INTERVAL``: whoever wins
+the ``cache.aadd`` lock calls BankID, everyone else reads the stored state.
+
+Each state carries a ``version`` that increases whenever ``status`` or
+``hintCode`` changes, so status streams and long-polls can wait for the next
+change. Completion data is reduced to what login needs before it is cached,
+with the personal number already replaced by its salted hash.
+"""
+import hashlib
+import logging
+from typing import TypedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import bankid_orders
+from .bankid import CollectResponse, CompletionUser, get_async_bankid_client
+
+logger = logging.getLogger(__name__)
+
+# BankID's recommended collect cadence, in seconds
+COLLECT_INTERVAL = 2
+
+LOCK_KEY = "bankid:collect:lock:{order_ref}"
+
+FINAL_STATUSES = ("complete", "failed")
+
+
+class CompletedUser(TypedDict):
+    personalNumberHash: str
+    givenName: str
+    surname: str
+
+
+class CollectState(TypedDict):
+    status: str
+    hintCode: str | None
+    version: int
+    user: CompletedUser | None
+
+
+def hash_personal_number(personal_number: str) -> str:
+    """
+    Hash a personal number with a salt before storing or looking it up.
+
+    Note: Do not store raw personal numbers to comply with privacy rules.
+    """
+    salt = settings.BANKID_SALT
+    return hashlib.sha256(f"{salt}{personal_number}".encode()).hexdigest()
+
+
+async def acollect(order: bankid_orders.BankIDOrder) -> CollectState:
+    """
+    Return the order's current state, calling BankID only if nobody has in
+    the last ``COLLECT_INTERVAL`` seconds. Final states are never re-collected.
+
+    ``order`` should be freshly read from the registry so its state is current.
+    """
+    order_ref = order["order_ref"]
+    state = order["state"]
+    if state and state["status"] in FINAL_STATUSES:
+        return state
+
+    if not await cache.aadd(LOCK_KEY.format(order_ref=order_ref), 1, COLLECT_INTERVAL):
+        return state or CollectState(status="pending", hintCode=None, version=0, user=None)
+
+    # The lock is left to expire, so a failing upstream is also retried at most every interval
+    result = await get_async_bankid_client().collect(order_ref)
+    new_state = _to_state(result, state)
+    await bankid_orders.asave_state(order, new_state)
+
+    if state is None or new_state["version"] != state["version"]:
+        logger.debug(f"BankID order {order_ref}: {new_state['status']} {new_state['hintCode']}")
+    return new_state
+
+
+def _to_state(result: CollectResponse, previous: CollectState | None) -> CollectState:
+    status = result["status"]
+    hint_code = result.get("hintCode")
+    version = previous["version"] if previous else 0
+    if previous is None or (previous["status"], previous["hintCode"]) != (status, hint_code):
+        version += 1
+
+    user = None
+    if status == "complete":
+        user = _completed_user(result["completionData"]["user"])
+
+    return CollectState(status=status, hintCode=hint_code, version=version, user=user)
+
+
+def _completed_user(user_data: CompletionUser) -> CompletedUser:
+    return CompletedUser(
+        personalNumberHash=hash_personal_number(user_data["personalNumber"]),
+        givenName=user_data["givenName"],
+        surname=user_data["surname"],
+    )
@@ -0,0 +1,117 @@
+"""
+Registry of outstanding BankID orders, kept in the cache (Redis in production).
+
+Each order is stored under its orderRef for BankID's order lifetime, together
+with the browser it belongs to, its QR start values and the latest collect
+state. Browsers are identified by a random ``bankid_client`` cookie whose hash
+also indexes their current order, so collect, cancel and the status streams
+find the order without touching the session table.
+
+The BankID views are async, so the registry is accessed through the cache's
+async API.
+"""
+import hashlib
+import secrets
+import time
+from typing import TYPE_CHECKING, TypedDict
+
+from django.core.cache import cache
+
+from .bankid import OrderResponse
+from .bankid_qr import QRSeed
+
+if TYPE_CHECKING:
+    # bankid_collect imports this module
+    from .bankid_collect import CollectState
+
+# Orders expire upstream after at most three minutes
+ORDER_TIMEOUT = 180
+
+ORDER_KEY = "bankid:order:{order_ref}"
+CLIENT_KEY = "bankid:client:{client_id}"
+
+CLIENT_COOKIE = "bankid_client"
+
+
+class BankIDOrder(TypedDict):
+    order_ref: str
+    client_id: str
+    personal_number_hash: str | None
+    auto_start_token: str
+    qr: QRSeed
+    started_at: float
+    state: "CollectState | None"
+
+
+def new_client_cookie() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def client_id(request) -> str | None:
+    """Registry id of the requesting browser, from its ``bankid_client`` cookie."""
+    cookie = request.COOKIES.get(CLIENT_COOKIE)
+    return client_id_for(cookie) if cookie else None
+
+
+def client_id_for(cookie: str) -> str:
+    # Only the hash is stored, so registry contents can't be replayed as cookies
+    return hashlib.sha256(cookie.encode()).hexdigest()
+
+
+async def aregister(
+    client_id: str,
+    response: OrderResponse,
+    personal_number_hash: str | None = None,
+) -> BankIDOrder:
+    """Record a newly started order as the client's current one."""
+    started_at = time.time()
+    order = BankIDOrder(
+        order_ref=response["orderRef"],
+        client_id=client_id,
+        personal_number_hash=personal_number_hash,
+        auto_start_token=response["autoStartToken"],
+        qr=QRSeed(token=response["qrStartToken"], secret=response["qrStartSecret"], started_at=started_at),
+        started_at=started_at,
+        state=None,
+    )
+    await cache.aset_many(
+        {
+            ORDER_KEY.format(order_ref=order["order_ref"]): order,
+            CLIENT_KEY.format(client_id=client_id): order["order_ref"],
+        },
+        ORDER_TIMEOUT,
+    )
+    return order
+
+
+async def aget_order(order_ref: str) -> BankIDOrder | None:
+    return await cache.aget(ORDER_KEY.format(order_ref=order_ref))
+
+
+async def aget_client_order(client_id: str | None) -> BankIDOrder | None:
+    """The client's current order, if it has one that hasn't expired."""
+    if not client_id:
+        return None
+    order_ref = await cache.aget(CLIENT_KEY.format(client_id=client_id))
+    if not order_ref:
+        return None
+    order = await aget_order(order_ref)
+    if order is None or order["client_id"] != client_id:
+        return None
+    return order
+
+
+async def asave_state(order: BankIDOrder, state: "CollectState") -> None:
+    """Store a new collect state, keeping the order's original expiry."""
+    order["state"] = state
+    remaining = int(order["started_at"] + ORDER_TIMEOUT - time.time())
+    if remaining > 0:
+        await cache.aset(ORDER_KEY.format(order_ref=order["order_ref"]), order, remaining)
+
+
+async def aforget(order: BankIDOrder) -> None:
+    """Remove a finished or cancelled order."""
+    await cache.adelete_many([
+        ORDER_KEY.format(order_ref=order["order_ref"]),
+        CLIENT_KEY.format(client_id=order["client_id"]),
+    ])
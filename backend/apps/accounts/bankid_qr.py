@@ -0,0 +1,50 @@
+"""
+Animated QR codes for BankID orders, generated server-side.
+
+The QR content changes every second:
+
+    bankid.<qrStartToken>.<seconds since order start>.<HMAC-SHA256(qrStartSecret, seconds)>
+
+The start token and secret are kept in the order registry (bankid_orders)
+and never sent to the browser; clients receive ready-to-render frames
+instead, either a short batch of upcoming seconds or a stream with one frame
+per second.
+
+Docs: https://developers.bankid.com/getting-started/frontend/qr-code
+"""
+import hashlib
+import hmac
+import time
+from typing import TypedDict
+
+# Upper bound for one batch; BankID shows a QR code for at most 30 seconds per order
+MAX_FRAMES = 30
+
+
+class QRSeed(TypedDict):
+    token: str
+    secret: str
+    started_at: float
+
+
+class QRFrame(TypedDict):
+    time: int
+    data: str
+
+
+def elapsed_seconds(seed: QRSeed, now: float | None = None) -> int:
+    return max(0, int((now or time.time()) - seed["started_at"]))
+
+
+def frames(seed: QRSeed, start: int, count: int) -> list[QRFrame]:
+    """QR payloads for ``count`` consecutive seconds from ``start``."""
+    # Key the HMAC once and copy the prepared state for each second
+    keyed = hmac.new(seed["secret"].encode(), digestmod=hashlib.sha256)
+    prefix = f"bankid.{seed['token']}."
+
+    result = []
+    for t in range(start, start + count):
+        mac = keyed.copy()
+        mac.update(str(t).encode())
+        result.append(QRFrame(time=t, data=f"{prefix}{t}.{mac.hexdigest()}"))
+    return result
@@ -0,0 +1,432 @@
+"""
+Local stand-in for the BankID RP API (v6), for integration and load tests.
+
+Serves ``/auth``, ``/sign``, ``/collect`` and ``/cancel`` over mutual TLS with
+certificates from ``generate_certificates``, so the real client in
+accounts.bankid (SSLContext, pooled session) is exercised unchanged: point
+``BANKID_API_URL`` and the ``BANKID_*_PATH`` settings at the simulator and
+its certificates.
+
+Each new order is assigned a scenario, drawn from a weighted mix, that
+scripts its pending hint codes over time and its final outcome. Latency,
+jitter and an error rate can be configured. ``GET /stats`` reports call
+counts per endpoint, the number of TLS connections accepted and the peak
+number of requests in flight since the previous ``/stats`` read, which shows
+how much collect fan-out and connection reuse a test run produced and how
+many upstream calls the backend workers kept open at once.
+
+Run it with ``manage.py bankid_simulator`` and drive it with
+``manage.py bankid_loadtest``.
+"""
+import base64
+import datetime
+import ipaddress
+import json
+import logging
+import random
+import secrets
+import ssl
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+logger = logging.getLogger(__name__)
+
+# Upstream order lifetime, after which pending orders fail with expiredTransaction
+ORDER_LIFETIME = 180
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Scripted order: (hintCode, seconds) steps while pending, then the outcome."""
+
+    hints: tuple[tuple[str, float], ...]
+    outcome: str  # "complete" or a failed hintCode such as "userCancel"
+
+
+SCENARIOS = {
+    "success": Scenario((("outstandingTransaction", 2.0), ("started", 1.0), ("userSign", 3.0)), "complete"),
+    "quick": Scenario((("userSign", 1.0),), "complete"),
+    "user_cancel": Scenario((("outstandingTransaction", 2.0), ("userSign", 2.0)), "userCancel"),
+    "start_failed": Scenario((("outstandingTransaction", 3.0),), "startFailed"),
+    "expired": Scenario((("outstandingTransaction", ORDER_LIFETIME),), "expiredTransaction"),
+}
+
+
+def parse_scenario_mix(spec: str) -> dict[str, float]:
+    """Parse ``"success=0.9,user_cancel=0.1"`` (or a single name) into weights."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not mix:
+        raise ValueError("Empty scenario mix")
+    return mix
+
+
+@dataclass
+class SimulatedOrder:
+    order_ref: str
+    kind: str  # "auth" or "sign"
+    scenario: Scenario
+    personal_number: str | None
+    started: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+
+    def status(self, speed: float) -> tuple[str, str | None]:
+        """(status, hintCode) at the current time; ``speed`` > 1 compresses the script."""
+        elapsed = (time.monotonic() - self.started) * speed
+        if self.cancelled:
+            return "failed", "cancelled"
+        if elapsed >= ORDER_LIFETIME:
+            return "failed", "expiredTransaction"
+
+        for hint_code, duration in self.scenario.hints:
+            if elapsed < duration:
+                return "pending", hint_code
+            elapsed -= duration
+
+        if self.scenario.outcome == "complete":
+            return "complete", None
+        return "failed", self.scenario.outcome
+
+
+class SimulatorState:
+    """Orders and counters shared by the request handler threads."""
+
+    def __init__(self, scenario_mix: dict[str, float], latency: float, jitter: float, error_rate: float, speed: float):
+        self.scenario_names = list(scenario_mix)
+        self.scenario_weights = list(scenario_mix.values())
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.speed = speed
+
+        self.orders: dict[str, SimulatedOrder] = {}
+        self.calls: Counter[str] = Counter()
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def new_order(self, kind: str, personal_number: str | None) -> SimulatedOrder | None:
+        """Create an order; None (and both orders cancelled) if one is outstanding for the same person."""
+        name = random.choices(self.scenario_names, self.scenario_weights)[0]
+        order = SimulatedOrder(uuid.uuid4().hex, kind, SCENARIOS[name], personal_number)
+
+        with self.lock:
+            if personal_number:
+                for other in self.orders.values():
+                    if other.personal_number == personal_number and other.status(self.speed)[0] == "pending":
+                        # BankID cancels both orders in this case
+                        other.cancelled = True
+                        return None
+            self.orders[order.order_ref] = order
+        return order
+
+    def get_order(self, order_ref: str) -> SimulatedOrder | None:
+        with self.lock:
+            order = self.orders.get(order_ref)
+            if order and (time.monotonic() - order.started) * self.speed >= ORDER_LIFETIME + 60:
+                del self.orders[order_ref]
+                return None
+            return order
+
+    def record_call(self, endpoint: str) -> None:
+        with self.lock:
+            self.calls[endpoint] += 1
+
+    def record_connection(self) -> None:
+        with self.lock:
+            self.connections += 1
+
+    def request_started(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Counters so far; the in-flight peak restarts from the current level on every read."""
+        with self.lock:
+            stats = {
+                "calls": dict(self.calls),
+                "connections": self.connections,
+                "orders": len(self.orders),
+                "peak_in_flight": self.peak_in_flight,
+            }
+            self.peak_in_flight = self.in_flight
+            return stats
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    server_version = "BankIDSimulator/1.0"
+
+    @property
+    def state(self) -> SimulatorState:
+        return self.server.state
+
+    def setup(self):
+        # Handshake here, in the connection's own thread, not in the accept loop
+        self.request.do_handshake()
+        super().setup()
+        self.state.record_connection()
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self):  # noqa: N802
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send(200, self.state.stats())
+        else:
+            self._send(404, {"errorCode": "notFound", "details": "Unknown endpoint"})
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"errorCode": "invalidParameters", "details": "Invalid JSON"})
+            return
+
+        endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+        handler = getattr(self, f"_handle_{endpoint}", None)
+        if handler is None:
+            self._send(404, {"errorCode": "notFound", "details": "Unknown endpoint"})
+            return
+
+        self.state.record_call(endpoint)
+        self.state.request_started()
+        try:
+            self._simulate_latency()
+            if random.random() < self.state.error_rate:
+                status, body = 503, {"errorCode": "maintenance", "details": "Simulated outage"}
+            else:
+                status, body = handler(payload)
+        finally:
+            self.state.request_finished()
+        self._send(status, body)
+
+    def _handle_auth(self, payload):
+        return self._start_order("auth", payload)
+
+    def _handle_sign(self, payload):
+        if not payload.get("userVisibleData"):
+            return 400, {"errorCode": "invalidParameters", "details": "userVisibleData is required"}
+        try:
+            base64.b64decode(payload["userVisibleData"], validate=True)
+        except ValueError:
+            return 400, {"errorCode": "invalidParameters", "details": "userVisibleData must be base64"}
+        return self._start_order("sign", payload)
+
+    def _start_order(self, kind, payload):
+        if not payload.get("endUserIp"):
+            return 400, {"errorCode": "invalidParameters", "details": "endUserIp is required"}
+
+        personal_number = (payload.get("requirement") or {}).get("personalNumber")
+        order = self.state.new_order(kind, personal_number)
+        if order is None:
+            return 400, {"errorCode": "alreadyInProgress", "details": "Order already in progress for pno"}
+
+        return 200, {
+            "orderRef": order.order_ref,
+            "autoStartToken": str(uuid.uuid4()),
+            "qrStartToken": str(uuid.uuid4()),
+            "qrStartSecret": str(uuid.uuid4()),
+        }
+
+    def _handle_collect(self, payload):
+        order = self.state.get_order(payload.get("orderRef", ""))
+        if order is None:
+            return 400, {"errorCode": "invalidParameters", "details": "No such order"}
+
+        status, hint_code = order.status(self.state.speed)
+        body = {"orderRef": order.order_ref, "status": status}
+        if hint_code:
+            body["hintCode"] = hint_code
+        if status == "complete":
+            body["completionData"] = self._completion_data(order)
+        return 200, body
+
+    def _handle_cancel(self, payload):
+        order = self.state.get_order(payload.get("orderRef", ""))
+        if order is None or order.status(self.state.speed)[0] != "pending":
+            return 400, {"errorCode": "invalidParameters", "details": "No such order"}
+        order.cancelled = True
+        return 200, {}
+
+    def _completion_data(self, order: SimulatedOrder) -> dict:
+        # Stable per order, so repeated collects of a completed order agree
+        rng = random.Random(order.order_ref)
+        personal_number = order.personal_number or f"19{rng.randint(40, 99)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{rng.randint(0, 9999):04d}"
+        given_name = rng.choice(["Anna", "Erik", "Maria", "Lars", "Karin", "Johan"])
+        surname = rng.choice(["Andersson", "Johansson", "Karlsson", "Nilsson", "Eriksson"])
+        return {
+            "user": {
+                "personalNumber": personal_number,
+                "name": f"{given_name} {surname}",
+                "givenName": given_name,
+                "surname": surname,
+            },
+            "device": {"ipAddress": "127.0.0.1", "uhi": secrets.token_urlsafe(20)},
+            "bankIdIssueDate": "2024-01-01",
+            "signature": base64.b64encode(b"<simulated signature/>").decode(),
+            "ocspResponse": base64.b64encode(b"simulated ocsp").decode(),
+        }
+
+    def _simulate_latency(self):
+        delay = self.state.latency + random.uniform(0, self.state.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Mostly rejected handshakes (no or untrusted client certificate)
+        logger.info(f"Connection from {client_address[0]} failed", exc_info=True)
+
+
+class BankIDSimulator:
+    """Threaded mutual-TLS server; use ``start()``/``stop()`` or ``serve_forever()``."""
+
+    def __init__(
+        self,
+        certs_dir: str | Path,
+        host: str = "127.0.0.1",
+        port: int = 8443,
+        scenario_mix: dict[str, float] | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        speed: float = 1.0,
+    ):
+        certs_dir = Path(certs_dir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.load_cert_chain(certs_dir / "server_cert.pem", certs_dir / "server_key.pem")
+        context.load_verify_locations(certs_dir / "ca.pem")
+        context.verify_mode = ssl.CERT_REQUIRED
+
+        self.server = SimulatorServer((host, port), SimulatorHandler)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True, do_handshake_on_connect=False)
+        self.server.state = SimulatorState(scenario_mix or {"success": 1.0}, latency, jitter, error_rate, speed)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"https://{host}:{port}/rp/v6.0"
+
+    @property
+    def state(self) -> SimulatorState:
+        return self.server.state
+
+    def serve_forever(self) -> None:
+        self.server.serve_forever()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name="bankid-simulator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def generate_certificates(certs_dir: str | Path, hosts: tuple[str, ...] = ("localhost", "127.0.0.1")) -> Path:
+    """
+    Write a throwaway CA plus server and client certificates to ``certs_dir``:
+    ca.pem, server_cert.pem, server_key.pem, client_cert.pem, client_key.pem.
+    """
+    certs_dir = Path(certs_dir)
+    certs_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.datetime.now(datetime.UTC)
+
+    def _key():
+        return ec.generate_private_key(ec.SECP256R1())
+
+    def _name(common_name):
+        return x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+
+    def _builder(subject, issuer, public_key):
+        return (
+            x509.CertificateBuilder()
+            .subject_name(subject)
+            .issuer_name(issuer)
+            .public_key(public_key)
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=5))
+            .not_valid_after(now + datetime.timedelta(days=365))
+        )
+
+    ca_key = _key()
+    ca_name = _name("BankID Simulator CA")
+    ca_cert = (
+        _builder(ca_name, ca_name, ca_key.public_key())
+        .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True)
+        .sign(ca_key, hashes.SHA256())
+    )
+
+    alt_names = []
+    for host in hosts:
+        try:
+            alt_names.append(x509.IPAddress(ipaddress.ip_address(host)))
+        except ValueError:
+            alt_names.append(x509.DNSName(host))
+
+    server_key = _key()
+    server_cert = (
+        _builder(_name(hosts[0]), ca_name, server_key.public_key())
+        .add_extension(x509.SubjectAlternativeName(alt_names), critical=False)
+        .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH]), critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+
+    client_key = _key()
+    client_cert = (
+        _builder(_name("BankID Simulator RP"), ca_name, client_key.public_key())
+        .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.CLIENT_AUTH]), critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+
+    def _write_cert(name, cert):
+        (certs_dir / name).write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+
+    def _write_key(name, key):
+        (certs_dir / name).write_bytes(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+
+    _write_cert("ca.pem", ca_cert)
+    _write_cert("server_cert.pem", server_cert)
+    _write_key("server_key.pem", server_key)
+    _write_cert("client_cert.pem", client_cert)
+    _write_key("client_key.pem", client_key)
+    return certs_dir
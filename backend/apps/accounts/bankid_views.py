@@ -3,206 +3,241 @@ BankID authentication views for Swedish identity verification.
 
 This module implements a separate authentication flow using BankID.
 It is kept distinct from the traditional auth and OAuth flows.
+
+Orders are tracked in the cache-backed registry in bankid_orders and bound to
+the browser by the ``bankid_client`` cookie, so these views neither read nor
+write the session, and collect/cancel make no database round trips.
+
+All views here are async: BankID is called through the per-event-loop httpx
+client and users are looked up with the async ORM, so under the ASGI
+deployment a slow RP API response holds a coroutine rather than a worker.
 """
-import hashlib
+import asyncio
+import json
 import logging
-from typing import Any
+import time
 
-import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from rest_framework import status
-from rest_framework.permissions import AllowAny
-from rest_framework.response import Response
-from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
+from . import bankid_collect, bankid_orders, bankid_qr
+from .bankid import CLIENT_ERRORS, BankIDError, OrderResponse, get_async_bankid_client
 from .models import User
-from .security_utils import get_client_ip, track_login_attempt
-from .views import set_auth_cookies
+from .security_utils import get_client_ip
+from .views import complete_login, set_auth_cookies
 
 logger = logging.getLogger(__name__)
 
+# How long a long-poll request waits for a change, and how often held
+# connections re-check the shared state
+LONG_POLL_TIMEOUT = 25
+STATUS_CHECK_INTERVAL = 1
+
+HINT_MESSAGES: dict[str | None, str] = {
+    'outstandingTransaction': 'Open your BankID app to complete authentication',
+    'noClient': 'BankID app not found. Please install BankID.',
+    'started': 'Starting BankID...',
+    'userSign': 'Enter your security code in the BankID app',
+    'userCancel': 'Authentication cancelled by user',
+}
+
+
+def hint_message(hint_code: str | None) -> str:
+    """Return a human-friendly message for BankID hint codes."""
+    return HINT_MESSAGES.get(hint_code, 'Processing BankID authentication...')
+
 
-class BankIDInitiateView(APIView):
+def _json_body(request) -> dict:
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BankIDInitiateView(View):
     """
     Start a BankID authentication session.
 
     POST /api/accounts/bankid/initiate/
     """
-    permission_classes = [AllowAny]
+    http_method_names = ['post']
 
-    def post(self, request):
+    async def post(self, request):
         """
         Start BankID authentication. Optionally accept a personal number
         for a faster login flow.
+
+        Idempotent per browser: while its previous order for the same
+        personal number is still outstanding, that order is returned again.
         """
-        personal_number = request.data.get('personalNumber')
+        personal_number = _json_body(request).get('personalNumber')
+        personal_number_hash = bankid_collect.hash_personal_number(personal_number) if personal_number else None
         ip_address = get_client_ip(request)
 
+        client_cookie = None
+        client_id = bankid_orders.client_id(request)
+        order = await bankid_orders.aget_client_order(client_id)
+
+        if order and self._is_reusable(order, personal_number_hash):
+            logger.info(f"BankID auth reused: {order['order_ref']}")
+            return JsonResponse(self._order_payload(order))
+
         try:
-            # Start authentication with BankID API
-            bankid_response = self._start_bankid_auth(personal_number, ip_address)
+            if order:
+                # Replace the browser's previous order rather than leaving it open upstream
+                await self._cancel_quietly(order)
 
-            # Save order reference in session so frontend can poll status
-            order_ref = bankid_response['orderRef']
-            request.session['bankid_order_ref'] = order_ref
+            if client_id is None:
+                client_cookie = bankid_orders.new_client_cookie()
+                client_id = bankid_orders.client_id_for(client_cookie)
 
-            logger.info(f"BankID auth initiated: {order_ref}")
+            # Start authentication with BankID API
+            bankid_response = await self._start_bankid_auth(personal_number, ip_address)
+            order = await bankid_orders.aregister(client_id, bankid_response, personal_number_hash)
+
+            logger.info(f"BankID auth initiated: {order['order_ref']}")
 
-            return Response({
-                'orderRef': order_ref,
-                'autoStartToken': bankid_response['autoStartToken'],
-                'qrStartToken': bankid_response.get('qrStartToken'),
-                'qrStartSecret': bankid_response.get('qrStartSecret'),
-            }, status=status.HTTP_200_OK)
+        except BankIDError as e:
+            logger.warning(f"BankID initiation rejected: {e.error_code}")
+            if e.error_code == 'alreadyInProgress':
+                return JsonResponse(
+                    {'detail': 'A BankID login for this person is already in progress. Please try again.'},
+                    status=409
+                )
+            return JsonResponse({'detail': 'Failed to start BankID authentication'}, status=500)
 
-        except requests.RequestException as e:
+        except CLIENT_ERRORS as e:
             logger.error(f"BankID initiation failed: {e}")
-            return Response(
-                {'detail': 'Failed to start BankID authentication'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            return JsonResponse({'detail': 'Failed to start BankID authentication'}, status=500)
+
+        response = JsonResponse(self._order_payload(order))
+        if client_cookie:
+            response.set_cookie(
+                bankid_orders.CLIENT_COOKIE,
+                client_cookie,
+                httponly=True,
+                secure=not settings.DEBUG,
+                samesite='Lax',
             )
+        return response
+
+    @staticmethod
+    def _is_reusable(order: bankid_orders.BankIDOrder, personal_number_hash: str | None) -> bool:
+        state = order['state']
+        return (
+            order['personal_number_hash'] == personal_number_hash
+            and (state is None or state['status'] == 'pending')
+        )
+
+    @staticmethod
+    def _order_payload(order: bankid_orders.BankIDOrder) -> dict:
+        return {
+            'orderRef': order['order_ref'],
+            'autoStartToken': order['auto_start_token'],
+        }
 
-    def _start_bankid_auth(self, personal_number: str | None, ip_address: str) -> dict[str, Any]:
+    @staticmethod
+    async def _cancel_quietly(order: bankid_orders.BankIDOrder) -> None:
+        try:
+            await get_async_bankid_client().cancel(order['order_ref'])
+        except CLIENT_ERRORS as e:
+            logger.info(f"Could not cancel replaced BankID order {order['order_ref']}: {e}")
+        await bankid_orders.aforget(order)
+
+    async def _start_bankid_auth(self, personal_number: str | None, ip_address: str) -> OrderResponse:
         """
         Call the BankID auth endpoint to start an authentication session.
 
         Docs: https://developers.bankid.com/api-references/auth-sign#auth
         """
-        bankid_url = f"{settings.BANKID_API_URL}/auth"
-
-        payload = {'endUserIp': ip_address}
-        if personal_number:
-            payload['personalNumber'] = personal_number
-
-        response = requests.post(
-            bankid_url,
-            json=payload,
-            cert=(settings.BANKID_CERT_PATH, settings.BANKID_KEY_PATH),
-            verify=settings.BANKID_CA_CERT_PATH,
-            timeout=10
-        )
-        response.raise_for_status()
+        return await get_async_bankid_client().auth(ip_address, personal_number=personal_number)
 
-        return response.json()
 
-
-class BankIDCollectView(APIView):
+@method_decorator(csrf_exempt, name='dispatch')
+class BankIDCollectView(View):
     """
     Poll BankID for authentication status.
 
-    Frontend typically polls this endpoint repeatedly until completion.
+    Returns the shared collect state (see bankid_collect), so repeated calls
+    within the collect interval don't reach BankID. Clients should wait on
+    ``bankid/status/`` and call this once the order is complete to log in.
     POST /api/accounts/bankid/collect/
     """
-    permission_classes = [AllowAny]
+    http_method_names = ['post']
 
-    def post(self, request):
+    async def post(self, request):
         """Check the status of an active BankID authentication."""
-        order_ref = request.session.get('bankid_order_ref')
+        order = await bankid_orders.aget_client_order(bankid_orders.client_id(request))
 
-        if not order_ref:
-            return Response(
-                {'detail': 'No active BankID session'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if not order:
+            return JsonResponse({'detail': 'No active BankID session'}, status=400)
 
         try:
-            # Query BankID collect endpoint for current status
-            result = self._collect_bankid_result(order_ref)
-
-            if result['status'] == 'pending':
-                return Response({
-                    'status': 'pending',
-                    'hintCode': result.get('hintCode'),
-                    'message': self._get_user_message(result.get('hintCode'))
-                })
-
-            elif result['status'] == 'complete':
-                # Authentication succeeded; extract verified identity data
-                completion_data = result['completionData']
-                user_data = completion_data['user']
-
-                # Create or update a user record using verified BankID data
-                user = self._get_or_create_bankid_user(user_data, request)
-
-                # Record successful login attempt
-                track_login_attempt(user, request, success=True)
-
-                # Issue JWT tokens for the user
-                refresh = RefreshToken.for_user(user)
-                tokens = {
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token)
-                }
-
-                # Clear session state
-                del request.session['bankid_order_ref']
-
-                logger.info(f"BankID auth completed for user: {user.email}")
-
-                response = Response({
-                    'status': 'complete',
-                    'user': {
-                        'id': str(user.id),
-                        'email': user.email,
-                        'first_name': user.first_name,
-                        'last_name': user.last_name,
-                        'bankid_verified': True
-                    },
-                    'tokens': tokens
-                })
-
-                return set_auth_cookies(response, tokens)
-
-            elif result['status'] == 'failed':
-                logger.warning(f"BankID auth failed: {result.get('hintCode')}")
-                return Response({
-                    'status': 'failed',
-                    'message': 'BankID authentication failed'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-        except requests.RequestException as e:
+            # Shared, rate-limited view of the BankID collect status
+            result = await bankid_collect.acollect(order)
+        except CLIENT_ERRORS as e:
             logger.error(f"BankID collection error: {e}")
-            return Response(
-                {'detail': 'Failed to collect BankID status'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-    def _collect_bankid_result(self, order_ref: str) -> dict[str, Any]:
-        """
-        Call BankID collect endpoint to obtain the current authentication status.
-
-        Docs: https://developers.bankid.com/api-references/auth-sign#collect
-        """
-        bankid_url = f"{settings.BANKID_API_URL}/collect"
-
-        response = requests.post(
-            bankid_url,
-            json={'orderRef': order_ref},
-            cert=(settings.BANKID_CERT_PATH, settings.BANKID_KEY_PATH),
-            verify=settings.BANKID_CA_CERT_PATH,
-            timeout=10
-        )
-        response.raise_for_status()
-
-        return response.json()
-
-    def _get_or_create_bankid_user(self, user_data: dict[str, Any], request) -> User:
+            return JsonResponse({'detail': 'Failed to collect BankID status'}, status=500)
+
+        if result['status'] == 'pending':
+            return JsonResponse({
+                'status': 'pending',
+                'hintCode': result['hintCode'],
+                'message': hint_message(result['hintCode'])
+            })
+
+        if result['status'] == 'failed':
+            logger.warning(f"BankID auth failed: {result['hintCode']}")
+            await bankid_orders.aforget(order)
+            return JsonResponse({
+                'status': 'failed',
+                'message': 'BankID authentication failed'
+            }, status=400)
+
+        # Create or update a user record using verified BankID data
+        user = await self._get_or_create_bankid_user(result['user'])
+
+        # Record the login and issue JWT tokens for the user
+        tokens = await sync_to_async(complete_login)(user, request)
+
+        # The order is consumed; a second collect can't log in again
+        await bankid_orders.aforget(order)
+
+        logger.info(f"BankID auth completed for user: {user.email}")
+
+        response = JsonResponse({
+            'status': 'complete',
+            'user': {
+                'id': str(user.id),
+                'email': user.email,
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+                'bankid_verified': True
+            },
+            'tokens': tokens
+        })
+
+        return set_auth_cookies(response, tokens)
+
+    async def _get_or_create_bankid_user(self, user_data: bankid_collect.CompletedUser) -> User:
         """
         Create or update a User record based on verified BankID data.
 
-        The personal number is hashed before storage for privacy and compliance.
+        The personal number arrives already hashed; the raw value is never stored.
         """
-        personal_number = user_data['personalNumber']
         given_name = user_data['givenName']
         surname = user_data['surname']
-
-        # Hash the personal number before any storage or lookup
-        hashed_pn = self._hash_personal_number(personal_number)
+        hashed_pn = user_data['personalNumberHash']
 
         try:
-            user = User.objects.get(bankid_personal_number=hashed_pn)
+            user = await User.objects.aget(bankid_personal_number=hashed_pn)
 
             # Update user fields based on verified BankID information
             user.bankid_verified = True
@@ -211,7 +246,7 @@ class BankIDCollectView(APIView):
             user.last_name = surname
             user.email_verified = True
             user.is_active = True
-            user.save(update_fields=[
+            await user.asave(update_fields=[
                 'bankid_verified',
                 'bankid_verified_at',
                 'first_name',
@@ -227,7 +262,7 @@ class BankIDCollectView(APIView):
             username = f"bankid_{hashed_pn[:16]}"
             temp_email = f"bankid_{hashed_pn[:16]}@valunds.se"
 
-            user = User.objects.create(
+            user = await User.objects.acreate(
                 username=username,
                 email=temp_email,
                 first_name=given_name,
@@ -243,55 +278,161 @@ class BankIDCollectView(APIView):
 
         return user
 
-    def _hash_personal_number(self, personal_number: str) -> str:
-        """
-        Hash a personal number with a salt before storing or looking it up.
-
-        Note: Do not store raw personal numbers to comply with privacy rules.
-        """
-        salt = settings.BANKID_SALT
-        return hashlib.sha256(f"{salt}{personal_number}".encode()).hexdigest()
-
-    def _get_user_message(self, hint_code: str) -> str:
-        """Return a human-friendly message for BankID hint codes."""
-        messages = {
-            'outstandingTransaction': 'Open your BankID app to complete authentication',
-            'noClient': 'BankID app not found. Please install BankID.',
-            'started': 'Starting BankID...',
-            'userSign': 'Enter your security code in the BankID app',
-            'userCancel': 'Authentication cancelled by user',
-        }
-        return messages.get(hint_code, 'Processing BankID authentication...')
 
 
-class BankIDCancelView(APIView):
+@method_decorator(csrf_exempt, name='dispatch')
+class BankIDCancelView(View):
     """
     Cancel an ongoing BankID authentication session.
 
     POST /api/accounts/bankid/cancel/
     """
-    permission_classes = [AllowAny]
+    http_method_names = ['post']
 
-    def post(self, request):
-        """Cancel an active BankID session and clear session state."""
-        order_ref = request.session.get('bankid_order_ref')
+    async def post(self, request):
+        """Cancel an active BankID order and remove it from the registry."""
+        order = await bankid_orders.aget_client_order(bankid_orders.client_id(request))
 
-        if order_ref:
+        if order:
             try:
                 # Notify BankID service to cancel the order
-                bankid_url = f"{settings.BANKID_API_URL}/cancel"
-                requests.post(
-                    bankid_url,
-                    json={'orderRef': order_ref},
-                    cert=(settings.BANKID_CERT_PATH, settings.BANKID_KEY_PATH),
-                    verify=settings.BANKID_CA_CERT_PATH,
-                    timeout=5
-                )
-                logger.info(f"BankID session cancelled: {order_ref}")
-            except requests.RequestException as e:
+                await get_async_bankid_client().cancel(order['order_ref'])
+                logger.info(f"BankID session cancelled: {order['order_ref']}")
+            except CLIENT_ERRORS as e:
                 logger.error(f"Error cancelling BankID: {e}")
 
-            # Remove order reference from session
-            del request.session['bankid_order_ref']
+            await bankid_orders.aforget(order)
+
+        return JsonResponse({'detail': 'BankID authentication cancelled'})
+
+
+async def bankid_status(request):
+    """
+    Wait for BankID status changes without polling ``collect/``.
+
+    GET /api/accounts/bankid/status/
 
-        return Response({'detail': 'BankID authentication cancelled'})
+    With ``Accept: text/event-stream`` this is a Server-Sent Events stream
+    that emits a ``status`` event on every status/hint change and closes once
+    the order is complete or failed. Otherwise it long-polls: it returns as
+    soon as the state version is newer than ``?since=`` or after
+    ``LONG_POLL_TIMEOUT`` seconds. Served from the ASGI app, so held
+    connections don't occupy sync workers.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Method not allowed'}, status=405)
+
+    client_id = bankid_orders.client_id(request)
+    if not await bankid_orders.aget_client_order(client_id):
+        return JsonResponse({'detail': 'No active BankID session'}, status=400)
+
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(_status_events(client_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid since'}, status=400)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LONG_POLL_TIMEOUT
+    try:
+        while True:
+            state = await _acollect(client_id)
+            if state['version'] > since or state['status'] in bankid_collect.FINAL_STATUSES or loop.time() >= deadline:
+                return JsonResponse(_public_state(state))
+            await asyncio.sleep(STATUS_CHECK_INTERVAL)
+    except CLIENT_ERRORS as e:
+        logger.error(f"BankID collection error: {e}")
+        return JsonResponse({'detail': 'Failed to collect BankID status'}, status=502)
+
+
+async def _status_events(client_id: str):
+    version = None
+    try:
+        while True:
+            state = await _acollect(client_id)
+            if state['version'] != version:
+                version = state['version']
+                yield f"event: status\ndata: {json.dumps(_public_state(state))}\n\n"
+            if state['status'] in bankid_collect.FINAL_STATUSES:
+                return
+            await asyncio.sleep(STATUS_CHECK_INTERVAL)
+    except CLIENT_ERRORS as e:
+        logger.error(f"BankID collection error: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': 'Failed to collect BankID status'})}\n\n"
+
+
+async def _acollect(client_id: str) -> bankid_collect.CollectState:
+    order = await bankid_orders.aget_client_order(client_id)
+    if order is None:
+        # Consumed by collect/, cancelled or expired
+        return bankid_collect.CollectState(status='failed', hintCode='expiredTransaction', version=-1, user=None)
+    return await bankid_collect.acollect(order)
+
+
+def _public_state(state: bankid_collect.CollectState) -> dict:
+    return {
+        'status': state['status'],
+        'hintCode': state['hintCode'],
+        'message': hint_message(state['hintCode']),
+        'version': state['version'],
+    }
+
+
+async def bankid_qr_frames(request):
+    """
+    Animated QR code frames for the active order.
+
+    GET /api/accounts/bankid/qr/
+
+    Returns ``?count=`` (default 5, at most ``bankid_qr.MAX_FRAMES``) upcoming
+    one-second frames as ``{"frames": [{"time", "data"}, ...]}`` so the client
+    can keep drawing without a round trip per second. With
+    ``Accept: text/event-stream`` it instead pushes a ``frame`` event every
+    second until the order completes, fails or expires.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Method not allowed'}, status=405)
+
+    client_id = bankid_orders.client_id(request)
+    order = await bankid_orders.aget_client_order(client_id)
+    if not order:
+        return JsonResponse({'detail': 'No active BankID session'}, status=400)
+
+    seed = order['qr']
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(_qr_events(client_id, seed), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    try:
+        count = min(max(int(request.GET.get('count', 5)), 1), bankid_qr.MAX_FRAMES)
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid count'}, status=400)
+
+    frames = bankid_qr.frames(seed, bankid_qr.elapsed_seconds(seed), count)
+    response = JsonResponse({'frames': frames})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+async def _qr_events(client_id: str, seed: bankid_qr.QRSeed):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + bankid_orders.ORDER_TIMEOUT
+
+    while loop.time() < deadline:
+        order = await bankid_orders.aget_client_order(client_id)
+        if order is None or (order['state'] and order['state']['status'] in bankid_collect.FINAL_STATUSES):
+            return
+
+        frame = bankid_qr.frames(seed, bankid_qr.elapsed_seconds(seed), 1)[0]
+        yield f"event: frame\ndata: {json.dumps(frame)}\n\n"
+
+        # Wake up at the next whole second of the order's QR clock
+        elapsed = time.time() - seed['started_at']
+        await asyncio.sleep(1 - elapsed % 1)
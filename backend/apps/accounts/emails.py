@@ -0,0 +1,216 @@
+"""
+Account email rendering and delivery through a transactional outbox.
+
+Views and security helpers call ``queue_email`` inside the transaction that
+changes account state. The rendered message is stored in ``email_outbox`` and
+handed to the Celery worker once that transaction commits, so requests never
+wait on SMTP. Messages that fail are retried with exponential backoff by the
+periodic drain task.
+
+Each email is a pair of templates, ``<name>.html`` and a hand-written
+``<name>.txt`` plain-text part, compiled once per process.
+"""
+import logging
+from datetime import timedelta
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_DELIVERY_ATTEMPTS = 8
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+# How long a claimed message is hidden from other workers while it is sent
+CLAIM_LEASE = timedelta(minutes=5)
+
+EMAIL_TEMPLATES = (
+    "accounts/account_locked",
+    "accounts/email_change_notification",
+    "accounts/new_login_detected",
+    "accounts/password_changed",
+    "accounts/password_reset_notification",
+    "accounts/reset_password_email",
+    "accounts/verify_email",
+)
+
+# Email name -> compiled (text, html) templates of whichever backend loaded them
+_compiled_templates: dict[str, tuple[Any, Any]] = {}
+
+
+class QueuedEmail(NamedTuple):
+    template: str  # base name without extension, e.g. "accounts/verify_email"
+    context: dict
+    subject: str
+    recipient: str
+
+
+def get_email_templates(name: str):
+    """
+    Return the compiled (text, html) templates for an email.
+
+    Templates are compiled on first use and kept for the life of the process;
+    in DEBUG they are reloaded on every call so edits show up immediately.
+    """
+    templates = _compiled_templates.get(name)
+    if templates is None:
+        templates = (get_template(f"{name}.txt"), get_template(f"{name}.html"))
+        if not settings.DEBUG:
+            _compiled_templates[name] = templates
+    return templates
+
+
+def preload_email_templates() -> None:
+    """Compile every account email template up front, e.g. at worker start."""
+    for name in EMAIL_TEMPLATES:
+        get_email_templates(name)
+
+
+def render_email(name: str, context: dict) -> tuple[str, str]:
+    """Render an email's (plain text, html) bodies."""
+    text_template, html_template = get_email_templates(name)
+    return text_template.render(context), html_template.render(context)
+
+
+def render_emails(messages: list["QueuedEmail"]) -> list[tuple[str, str]]:
+    """Render a batch of emails, reusing the compiled templates across the batch."""
+    return [render_email(message.template, message.context) for message in messages]
+
+
+def queue_email(template: str, context: dict, subject: str, recipient: str) -> OutboundEmail:
+    """
+    Render an account email and write it to the outbox.
+
+    Delivery is dispatched after the surrounding transaction commits. If the
+    broker is unreachable the message stays pending for the drain task.
+    """
+    return queue_emails([QueuedEmail(template, context, subject, recipient)])[0]
+
+
+def queue_emails(messages: list[QueuedEmail]) -> list[OutboundEmail]:
+    """
+    Write several account emails to the outbox as one batch.
+
+    The batch is dispatched as a single task, so related notifications (for
+    example a reset link and its security notice) share one SMTP session.
+    """
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            recipient=message.recipient,
+            subject=message.subject,
+            body=text_body,
+            html_body=html_body,
+        )
+        for message, (text_body, html_body) in zip(messages, render_emails(messages), strict=True)
+    ])
+    email_ids = [str(email.pk) for email in emails]
+    transaction.on_commit(lambda: _dispatch(email_ids))
+    return emails
+
+
+def _dispatch(email_ids: list[str]) -> None:
+    """Hand committed outbox messages to the worker."""
+    from .tasks import deliver_outbound_emails
+
+    try:
+        deliver_outbound_emails.delay(email_ids)
+    except Exception as e:
+        logger.warning(f"Could not dispatch outbound emails {email_ids}, leaving them for the drain: {e}")
+
+
+def claim_due_emails(limit: int = 100, ids: list[str] | None = None) -> list[OutboundEmail]:
+    """
+    Claim pending messages that are due for delivery.
+
+    Claimed rows get their ``next_attempt_at`` pushed out by ``CLAIM_LEASE`` so
+    concurrent drains skip them; a crashed worker's claim simply expires.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        queryset = OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+            status=OutboundEmail.Status.PENDING,
+            next_attempt_at__lte=now,
+        )
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+
+        emails = list(queryset.order_by("next_attempt_at")[:limit])
+        if emails:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+
+    return emails
+
+
+def deliver_emails(emails: list[OutboundEmail]) -> int:
+    """
+    Send claimed outbox messages over a single SMTP session.
+
+    Each message's outcome is recorded on its row. Returns the number sent.
+    """
+    if not emails:
+        return 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Could not connect to SMTP server: {e}")
+        for email in emails:
+            _schedule_retry(email, e)
+        return 0
+
+    sent = 0
+    try:
+        for email in emails:
+            message = EmailMultiAlternatives(
+                subject=email.subject,
+                body=email.body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[email.recipient],
+                connection=connection,
+            )
+            if email.html_body:
+                message.attach_alternative(email.html_body, "text/html")
+
+            try:
+                message.send()
+            except Exception as e:
+                _schedule_retry(email, e)
+                continue
+
+            email.status = OutboundEmail.Status.SENT
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ""
+            email.save(update_fields=["status", "attempts", "sent_at", "last_error"])
+            sent += 1
+    finally:
+        connection.close()
+
+    return sent
+
+
+def _schedule_retry(email: OutboundEmail, error: Exception) -> None:
+    """Record a failed attempt and back off exponentially, giving up after the limit."""
+    email.attempts += 1
+    email.last_error = str(error)
+
+    if email.attempts >= MAX_DELIVERY_ATTEMPTS:
+        email.status = OutboundEmail.Status.FAILED
+        logger.error(f"Giving up on email to {email.recipient} after {email.attempts} attempts: {error}")
+    else:
+        delay = min(RETRY_BASE_DELAY * 2 ** (email.attempts - 1), RETRY_MAX_DELAY)
+        email.next_attempt_at = timezone.now() + delay
+        logger.warning(f"Email to {email.recipient} failed (attempt {email.attempts}), retrying in {delay}: {error}")
+
+    email.save(update_fields=["status", "attempts", "last_error", "next_attempt_at"])
@@ -0,0 +1,192 @@
+"""
+Offline IP-to-location lookup over a compact, memory-mapped range database.
+
+The database is compiled from a CSV range dump by ``manage.py build_geoip_db``
+into a single read-only file:
+
+    header      "<4sHHIII"  magic, version, reserved, ipv4 count, ipv6 count, location count
+    ipv4 table  "<III"      start, end, location index           (sorted by start)
+    ipv6 table  "<16s16sI"  start, end (big-endian), location index (sorted by start)
+    offsets     "<I" * (location count + 1) into the string blob
+    strings     UTF-8 "City, Country" values, each stored once
+
+Lookups binary-search the mapped tables directly, so they take microseconds,
+never touch the network, and the pages are shared between all gunicorn
+workers through the OS page cache. Workers keep the file they opened; rebuild
+with an atomic replace and restart workers to pick up new data.
+"""
+import csv
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VGEO"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIII")
+IPV4_RECORD = struct.Struct("<III")
+IPV6_RECORD = struct.Struct("<16s16sI")
+OFFSET = struct.Struct("<I")
+
+
+class GeoIPDatabase:
+    """Read-only view of a compiled GeoIP range file."""
+
+    def __init__(self, path: str | Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.ipv4_count, self.ipv6_count, self.location_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a GeoIP database (version {VERSION})")
+
+        self._ipv4_offset = HEADER.size
+        self._ipv6_offset = self._ipv4_offset + self.ipv4_count * IPV4_RECORD.size
+        self._offsets_offset = self._ipv6_offset + self.ipv6_count * IPV6_RECORD.size
+        self._strings_offset = self._offsets_offset + (self.location_count + 1) * OFFSET.size
+
+    def lookup(self, ip_address: str) -> str:
+        """Return "City, Country" for an address, or "" if it is unknown or invalid."""
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return ""
+
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        if ip.version == 4:
+            index = self._search(int(ip), self._ipv4_offset, self.ipv4_count, IPV4_RECORD)
+        else:
+            index = self._search(ip.packed, self._ipv6_offset, self.ipv6_count, IPV6_RECORD)
+
+        return "" if index is None else self._location(index)
+
+    def _search(self, key, table_offset: int, count: int, record: struct.Struct) -> int | None:
+        """Binary search for the last range starting at or before ``key``."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = record.unpack_from(self._mm, table_offset + mid * record.size)[0]
+            if start <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo == 0:
+            return None
+
+        _, end, location_index = record.unpack_from(self._mm, table_offset + (lo - 1) * record.size)
+        return location_index if key <= end else None
+
+    def _location(self, index: int) -> str:
+        position = self._offsets_offset + index * OFFSET.size
+        start = OFFSET.unpack_from(self._mm, position)[0]
+        end = OFFSET.unpack_from(self._mm, position + OFFSET.size)[0]
+        return self._mm[self._strings_offset + start:self._strings_offset + end].decode()
+
+
+def _parse_ip(value: str) -> ipaddress.IPv4Address | ipaddress.IPv6Address:
+    """Accept dotted/colon notation or the integer form used by some range dumps."""
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return ipaddress.IPv4Address(number) if number < 2 ** 32 else ipaddress.IPv6Address(number)
+    return ipaddress.ip_address(value)
+
+
+def build_database(csv_path: str | Path, output_path: str | Path) -> tuple[int, int]:
+    """
+    Compile a CSV range dump into the binary format.
+
+    Rows are ``start_ip,end_ip,country[,city]``; a header row is skipped. Writes
+    to a temporary file and atomically replaces ``output_path``. Returns the
+    number of (ipv4, ipv6) ranges written.
+    """
+    ipv4_ranges: list[tuple[int, int, int]] = []
+    ipv6_ranges: list[tuple[bytes, bytes, int]] = []
+    locations: dict[str, int] = {}
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            try:
+                start, end = _parse_ip(row[0]), _parse_ip(row[1])
+            except ValueError:
+                continue  # header or malformed row
+
+            country = row[2].strip()
+            city = row[3].strip() if len(row) > 3 else ""
+            location = ", ".join(filter(None, [city, country]))
+            if not location or start.version != end.version:
+                continue
+
+            index = locations.setdefault(location, len(locations))
+            if start.version == 4:
+                ipv4_ranges.append((int(start), int(end), index))
+            else:
+                ipv6_ranges.append((start.packed, end.packed, index))
+
+    ipv4_ranges.sort()
+    ipv6_ranges.sort()
+
+    blob = bytearray()
+    offsets = [0]
+    for location in locations:  # insertion order matches the assigned indexes
+        blob += location.encode()
+        offsets.append(len(blob))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, 0, len(ipv4_ranges), len(ipv6_ranges), len(locations)))
+        for ipv4_range in ipv4_ranges:
+            out.write(IPV4_RECORD.pack(*ipv4_range))
+        for ipv6_range in ipv6_ranges:
+            out.write(IPV6_RECORD.pack(*ipv6_range))
+        for offset in offsets:
+            out.write(OFFSET.pack(offset))
+        out.write(blob)
+
+    os.replace(tmp_path, output_path)
+    return len(ipv4_ranges), len(ipv6_ranges)
+
+
+_database: GeoIPDatabase | None = None
+_database_loaded = False
+_database_lock = threading.Lock()
+
+
+def get_database() -> GeoIPDatabase | None:
+    """Open the configured database once per process; None if it isn't installed."""
+    global _database, _database_loaded
+
+    if not _database_loaded:
+        with _database_lock:
+            if not _database_loaded:
+                path = getattr(settings, "GEOIP_DB_PATH", "")
+                try:
+                    _database = GeoIPDatabase(path) if path and Path(path).exists() else None
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not open GeoIP database {path}: {e}")
+                    _database = None
+                _database_loaded = True
+
+    return _database
+
+
+def lookup_location(ip_address: str) -> str:
+    """Return "City, Country" for an IP address, or "" when unknown."""
+    database = get_database()
+    return database.lookup(ip_address) if database else ""
@@ -0,0 +1,187 @@
+"""
+Google sign-in: authorization-code exchange and local id_token verification.
+
+The token endpoint's response already contains a signed OpenID Connect
+``id_token`` with the user's email, names and ``email_verified``, so instead
+of a second round trip to the userinfo endpoint the token is verified here
+against Google's published signing keys (JWKS). The keys are cached in
+process and in the shared cache for as long as Google's ``Cache-Control:
+max-age`` allows, and refetched early only when a token names an unknown key.
+Both HTTP calls go through one keep-alive session per worker process; the
+async callback view exchanges codes with ``aexchange_code`` on the event
+loop's httpx client instead.
+
+``GOOGLE_TOKEN_URL`` and ``GOOGLE_JWKS_URL`` can point at a local stand-in.
+"""
+import logging
+import os
+import re
+import threading
+import time
+
+import httpx
+import jwt
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from .async_http import get_async_client
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+
+JWKS_CACHE_KEY = "google:jwks:v1"
+# Used when Google's response has no usable max-age
+DEFAULT_JWKS_MAX_AGE = 3600
+# Minimum spacing of refetches triggered by an unknown key id
+JWKS_REFRESH_COOLDOWN = 60
+CLOCK_SKEW = 30
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleAuthError(Exception):
+    """The code exchange failed or the id_token is not a valid Google token for us."""
+
+
+_session: requests.Session | None = None
+_session_pid: int | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return this process's keep-alive session to Google, creating it after fork."""
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session_pid != pid:
+        with _session_lock:
+            if _session_pid != pid:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+                _session, _session_pid = session, pid
+    return _session
+
+
+class GoogleKeySet:
+    """Google's id_token signing keys, refreshed on the Cache-Control schedule."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, kid: str) -> jwt.PyJWK:
+        with self._lock:
+            if time.time() >= self._expires_at:
+                self._load()
+            if kid not in self._keys and time.time() - self._last_fetch >= JWKS_REFRESH_COOLDOWN:
+                # Google rotated keys before our copy expired
+                self._load(force=True)
+
+            key = self._keys.get(kid)
+        if key is None:
+            raise GoogleAuthError(f"Unknown signing key {kid}")
+        return key
+
+    def _load(self, force: bool = False) -> None:
+        entry = None if force else cache.get(JWKS_CACHE_KEY)
+        if entry is None:
+            entry = self._fetch()
+            cache.set(JWKS_CACHE_KEY, entry, max(1, int(entry["expires_at"] - time.time())))
+
+        self._keys = {
+            jwk["kid"]: jwt.PyJWK(jwk)
+            for jwk in entry["keys"]
+            if jwk.get("kid") and jwk.get("use", "sig") == "sig"
+        }
+        self._expires_at = entry["expires_at"]
+
+    def _fetch(self) -> dict:
+        self._last_fetch = time.time()
+        try:
+            response = get_session().get(self.url, timeout=(3, 5))
+            response.raise_for_status()
+            keys = response.json()["keys"]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise GoogleAuthError(f"Could not fetch Google signing keys: {e}") from e
+
+        match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match[1]) if match else DEFAULT_JWKS_MAX_AGE
+        logger.info(f"Fetched {len(keys)} Google signing keys, valid for {max_age}s")
+        return {"keys": keys, "expires_at": time.time() + max_age}
+
+
+google_keys = GoogleKeySet(getattr(settings, "GOOGLE_JWKS_URL", JWKS_URL))
+
+
+def _token_request(code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+    return {
+        "code": code,
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "redirect_uri": redirect_uri,
+        "grant_type": "authorization_code",
+    }
+
+
+def _token_response(response) -> dict:
+    if response.status_code != 200:
+        raise GoogleAuthError(f"Token exchange failed with {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+
+def exchange_code(code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+    """Exchange an authorization code at Google's token endpoint; returns the token response."""
+    try:
+        response = get_session().post(
+            getattr(settings, "GOOGLE_TOKEN_URL", TOKEN_URL),
+            data=_token_request(code, client_id, client_secret, redirect_uri),
+            timeout=(3, 5),
+        )
+    except requests.RequestException as e:
+        raise GoogleAuthError(f"Token exchange failed: {e}") from e
+    return _token_response(response)
+
+
+async def aexchange_code(code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+    """``exchange_code`` for async views, on the event loop's httpx client."""
+    client = get_async_client("google", lambda: httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=4),
+        timeout=httpx.Timeout(5, connect=3),
+    ))
+    try:
+        response = await client.post(
+            getattr(settings, "GOOGLE_TOKEN_URL", TOKEN_URL),
+            data=_token_request(code, client_id, client_secret, redirect_uri),
+        )
+    except httpx.HTTPError as e:
+        raise GoogleAuthError(f"Token exchange failed: {e}") from e
+    return _token_response(response)
+
+
+def verify_id_token(id_token: str, client_id: str) -> dict:
+    """Verify signature, audience, issuer and expiry of a Google id_token; returns its claims."""
+    try:
+        header = jwt.get_unverified_header(id_token)
+        key = google_keys.get(header.get("kid", ""))
+        claims = jwt.decode(
+            id_token,
+            key.key,
+            algorithms=["RS256"],
+            audience=client_id,
+            leeway=CLOCK_SKEW,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise GoogleAuthError(f"Invalid id_token: {e}") from e
+
+    if claims["iss"] not in ISSUERS:
+        raise GoogleAuthError(f"Unexpected id_token issuer {claims['iss']}")
+    return claims
@@ -0,0 +1,30 @@
+"""
+Time-ordered UUIDs (version 7, RFC 9562) for primary keys.
+
+The first 48 bits are the Unix time in milliseconds and the next 12 bits
+the sub-millisecond fraction, so keys generated later sort later and new
+rows land at the right-hand edge of the primary-key B-tree instead of on
+random pages. The remaining 62 bits are random, which keeps keys globally
+unique and unguessable. Values are ordinary UUIDs in the same column type
+as ``uuid4`` keys, and the two kinds coexist in one table.
+"""
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """Return a new version 7 UUID."""
+    nanoseconds = time.time_ns()
+    milliseconds, remainder = divmod(nanoseconds, 1_000_000)
+    fraction = remainder * 4096 // 1_000_000
+    random_bits = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+
+    value = (
+        (milliseconds & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | fraction << 64
+        | 0b10 << 62
+        | random_bits
+    )
+    return uuid.UUID(int=value)
@@ -0,0 +1,243 @@
+"""
+Failed-login counting and account lockout.
+
+Two interchangeable backends, chosen by ``LOGIN_THROTTLE_BACKEND``:
+
+``redis``
+    Failures live in a per-user sorted set (a sliding window scored by time)
+    and the lock is a key with a native TTL. Each check or failure is one
+    round trip through a Lua script, so credential-stuffing traffic never
+    writes to the ``users`` table. The ``failed_login_attempts``,
+    ``last_failed_login`` and ``account_locked_until`` columns are only
+    refreshed asynchronously for the admin.
+
+``database``
+    The columns on ``users`` are the source of truth and are updated with a
+    single conditional UPDATE per failure. Used in DEBUG, where there is no
+    Redis.
+"""
+import logging
+import uuid
+from datetime import UTC, datetime, timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+# Lockout policy
+MAX_FAILED_LOGINS = 5
+FAILED_LOGIN_WINDOW = timedelta(minutes=15)
+LOCKOUT_DURATION = timedelta(minutes=15)
+
+# At most one users-row refresh per user per interval while failures keep coming
+STATE_SYNC_INTERVAL = 30
+
+
+class LoginState(NamedTuple):
+    failures: int
+    last_failure: datetime | None
+    locked_until: datetime | None
+
+
+class DatabaseLoginThrottle:
+    """Lockout state stored in the users table columns."""
+
+    def status(self, user, now: datetime) -> LoginState:
+        """Current state, read from the already-loaded user row."""
+        return LoginState(user.failed_login_attempts, user.last_failed_login, user.account_locked_until)
+
+    def record_failure(self, user, now: datetime) -> tuple[LoginState, bool]:
+        """
+        Count a failed attempt; returns the new state and whether this attempt locked the account.
+
+        The counter is reset when the previous failure is older than the window,
+        and the lock is applied when this attempt reaches the threshold; both
+        are evaluated by the database against the current row values.
+        """
+        user_model = get_user_model()
+        window_start = now - FAILED_LOGIN_WINDOW
+        in_window = Q(last_failed_login__isnull=True) | Q(last_failed_login__gte=window_start)
+
+        with transaction.atomic():
+            user_model.objects.filter(pk=user.pk).update(
+                failed_login_attempts=Case(
+                    When(in_window, then=F("failed_login_attempts") + 1),
+                    default=Value(1),
+                ),
+                last_failed_login=now,
+                account_locked_until=Case(
+                    When(
+                        in_window & Q(failed_login_attempts__gte=MAX_FAILED_LOGINS - 1),
+                        then=Value(now + LOCKOUT_DURATION),
+                    ),
+                    When(account_locked_until__gt=now, then=F("account_locked_until")),
+                    default=Value(None),
+                ),
+            )
+            # Read back inside the transaction so only the attempt that crossed
+            # the threshold sees it
+            user.refresh_from_db(fields=["failed_login_attempts", "last_failed_login", "account_locked_until"])
+            # update() sends no post_save, so retire cached snapshots here
+            transaction.on_commit(lambda: user_cache.bump(user.pk))
+
+        state = self.status(user, now)
+        return state, state.failures == MAX_FAILED_LOGINS
+
+    def clear_expired_lock(self, user, now: datetime) -> LoginState:
+        """Start counting afresh once the lock has run out, so reCAPTCHA is no longer required."""
+        user.failed_login_attempts = 0
+        user.account_locked_until = None
+        user.save(update_fields=["failed_login_attempts", "account_locked_until"])
+        return self.status(user, now)
+
+    def reset(self, user) -> list[str]:
+        """
+        Clear lockout state on the user object.
+
+        Returns the fields to include in the caller's next save, so the reset
+        rides along with the write that records the successful login.
+        """
+        user.failed_login_attempts = 0
+        user.last_failed_login = None
+        user.account_locked_until = None
+        return ["failed_login_attempts", "last_failed_login", "account_locked_until"]
+
+
+# KEYS: failures zset, lock key. ARGV: now_ms, window_ms.
+# Returns {failures in window, lock pttl, newest failure ms}.
+STATUS_SCRIPT = """
+local failures = redis.call('ZCOUNT', KEYS[1], '(' .. (ARGV[1] - ARGV[2]), '+inf')
+local newest = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+return {failures, redis.call('PTTL', KEYS[2]), newest[2] or 0}
+"""
+
+# KEYS: failures zset, lock key. ARGV: now_ms, window_ms, max failures, lock_ms, member.
+# Returns {failures in window, lock pttl, 1 if this attempt set the lock}.
+FAILURE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+local lock_ttl = redis.call('PTTL', KEYS[2])
+if lock_ttl > 0 then
+    return {redis.call('ZCARD', KEYS[1]), lock_ttl, 0}
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[5])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+local failures = redis.call('ZCARD', KEYS[1])
+if failures >= tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[2], ARGV[1], 'PX', ARGV[4])
+    return {failures, tonumber(ARGV[4]), 1}
+end
+return {failures, -2, 0}
+"""
+
+
+class RedisLoginThrottle:
+    """Lockout state in Redis, mirrored to the users table in the background."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from django_redis import get_redis_connection
+
+            client = get_redis_connection("default")
+        self.client = client
+        self._status_script = self.client.register_script(STATUS_SCRIPT)
+        self._failure_script = self.client.register_script(FAILURE_SCRIPT)
+
+    @staticmethod
+    def _keys(user_id) -> list[str]:
+        return [f"login:failures:{user_id}", f"login:lock:{user_id}"]
+
+    def status(self, user, now: datetime) -> LoginState:
+        return self.status_for(user.pk, now)
+
+    def status_for(self, user_id, now: datetime) -> LoginState:
+        now_ms = int(now.timestamp() * 1000)
+        failures, lock_ttl, newest_ms = self._status_script(
+            keys=self._keys(user_id),
+            args=[now_ms, int(FAILED_LOGIN_WINDOW.total_seconds() * 1000)],
+        )
+        return self._state(now, int(failures), int(lock_ttl), float(newest_ms))
+
+    def record_failure(self, user, now: datetime) -> tuple[LoginState, bool]:
+        now_ms = int(now.timestamp() * 1000)
+        failures, lock_ttl, newly_locked = self._failure_script(
+            keys=self._keys(user.pk),
+            args=[
+                now_ms,
+                int(FAILED_LOGIN_WINDOW.total_seconds() * 1000),
+                MAX_FAILED_LOGINS,
+                int(LOCKOUT_DURATION.total_seconds() * 1000),
+                f"{now_ms}:{uuid.uuid4().hex[:8]}",
+            ],
+        )
+
+        newly_locked = bool(newly_locked)
+        schedule_state_sync(user.pk, immediate=newly_locked)
+        return self._state(now, int(failures), int(lock_ttl), now_ms), newly_locked
+
+    def clear_expired_lock(self, user, now: datetime) -> LoginState:
+        # Nothing to clear: the lock key expires by itself, and by then the
+        # failures that set it have left the window
+        return self.status(user, now)
+
+    def reset(self, user) -> list[str]:
+        """
+        Drop the user's failure window and lock.
+
+        The users columns are cleared in the caller's next save only when they
+        still show stale lockout state, so a clean login adds no extra fields.
+        """
+        self.client.delete(*self._keys(user.pk))
+
+        if not (user.failed_login_attempts or user.last_failed_login or user.account_locked_until):
+            return []
+        return DatabaseLoginThrottle().reset(user)
+
+    def sync_user_columns(self, user_id) -> None:
+        """Copy the Redis state onto the users row for admin display."""
+        state = self.status_for(user_id, timezone.now())
+        get_user_model().objects.filter(pk=user_id).update(
+            failed_login_attempts=state.failures,
+            last_failed_login=state.last_failure,
+            account_locked_until=state.locked_until,
+        )
+        transaction.on_commit(lambda: user_cache.bump(user_id))
+
+    @staticmethod
+    def _state(now: datetime, failures: int, lock_ttl: int, newest_ms: float) -> LoginState:
+        locked_until = now + timedelta(milliseconds=lock_ttl) if lock_ttl > 0 else None
+        last_failure = datetime.fromtimestamp(newest_ms / 1000, tz=UTC) if newest_ms else None
+        return LoginState(failures, last_failure, locked_until)
+
+
+def schedule_state_sync(user_id, immediate: bool = False) -> None:
+    """Queue a users-row refresh, coalescing bursts of failures into one write."""
+    from .tasks import sync_login_state
+
+    try:
+        if immediate:
+            sync_login_state.delay(str(user_id))
+        elif cache.add(f"login:sync:{user_id}", 1, STATE_SYNC_INTERVAL):
+            sync_login_state.apply_async(args=[str(user_id)], countdown=STATE_SYNC_INTERVAL)
+    except Exception as e:
+        # Display-only state; Redis remains authoritative
+        logger.warning(f"Could not schedule login state sync for {user_id}: {e}")
+
+
+_throttle = None
+
+
+def get_login_throttle() -> DatabaseLoginThrottle | RedisLoginThrottle:
+    """Return the process-wide throttle for ``LOGIN_THROTTLE_BACKEND``."""
+    global _throttle
+    if _throttle is None:
+        backend = getattr(settings, "LOGIN_THROTTLE_BACKEND", "database")
+        _throttle = RedisLoginThrottle() if backend == "redis" else DatabaseLoginThrottle()
+    return _throttle
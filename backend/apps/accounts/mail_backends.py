@@ -0,0 +1,132 @@
+"""
+SMTP email backend that keeps authenticated connections open between sends.
+
+Django's stock SMTP backend opens, authenticates and quits a session for every
+``send_messages`` call. This backend hands closed connections back to a small
+per-process pool instead, so the next batch skips the TCP/TLS handshake and
+AUTH exchange. Sessions the server has dropped while idle are replaced
+transparently.
+"""
+import atexit
+import logging
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """Idle SMTP sessions per (host, port, user, security) key, newest last."""
+
+    def __init__(self):
+        self._idle: dict[tuple, list[tuple[smtplib.SMTP, float]]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: tuple, max_idle: float) -> smtplib.SMTP | None:
+        """Return a pooled session for ``key``, discarding any idle for too long."""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                connection, released_at = idle.pop()
+                if now - released_at <= max_idle:
+                    return connection
+                _quit(connection)
+        return None
+
+    def release(self, key: tuple, connection: smtplib.SMTP, size: int) -> None:
+        """Return a session to the pool, closing it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < size:
+                idle.append((connection, time.monotonic()))
+                return
+        _quit(connection)
+
+    def close_all(self) -> None:
+        """Quit every pooled session."""
+        with self._lock:
+            pooled = [connection for idle in self._idle.values() for connection, _ in idle]
+            self._idle.clear()
+        for connection in pooled:
+            _quit(connection)
+
+
+def _quit(connection: smtplib.SMTP) -> None:
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+_pool = SMTPConnectionPool()
+atexit.register(_pool.close_all)
+
+
+class PooledSMTPEmailBackend(SMTPEmailBackend):
+    """
+    SMTP backend that reuses authenticated sessions across messages.
+
+    Configure with ``EMAIL_POOL_SIZE`` (idle sessions kept per process) and
+    ``EMAIL_POOL_MAX_IDLE`` (seconds before an idle session is dropped rather
+    than reused; keep it below the server's own idle timeout).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_size = getattr(settings, "EMAIL_POOL_SIZE", 2)
+        self.pool_max_idle = getattr(settings, "EMAIL_POOL_MAX_IDLE", 120)
+
+    @property
+    def pool_key(self) -> tuple:
+        return (self.host, self.port, self.username, self.use_ssl, self.use_tls)
+
+    def open(self):
+        if self.connection:
+            return False
+
+        connection = _pool.acquire(self.pool_key, self.pool_max_idle)
+        if connection is not None:
+            self.connection = connection
+            return True
+
+        return super().open()
+
+    def close(self):
+        """Return the session to the pool instead of sending QUIT."""
+        if self.connection is None:
+            return
+
+        connection, self.connection = self.connection, None
+        _pool.release(self.pool_key, connection, self.pool_size)
+
+    def _send(self, email_message):
+        # The first attempt always raises, so a session the server timed out
+        # is replaced even when fail_silently would hide the disconnect
+        fail_silently, self.fail_silently = self.fail_silently, False
+        try:
+            return super()._send(email_message)
+        except smtplib.SMTPServerDisconnected:
+            logger.info(f"Pooled SMTP session to {self.host} was closed by the server, reconnecting")
+        except smtplib.SMTPException:
+            if not fail_silently:
+                raise
+            return False
+        finally:
+            self.fail_silently = fail_silently
+
+        # Reconnect once and retry; both steps honour fail_silently again
+        self._discard()
+        if not super().open():
+            return False
+        return super()._send(email_message)
+
+    def _discard(self):
+        """Drop the current session without returning it to the pool."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
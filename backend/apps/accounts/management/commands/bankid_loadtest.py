@@ -0,0 +1,129 @@
+import statistics
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.apps.accounts.bankid import get_ssl_context
+
+
+def _percentiles(samples: list[float]) -> str:
+    if len(samples) < 2:
+        return f"n={len(samples)}"
+    cuts = statistics.quantiles(samples, n=100)
+    return f"n={len(samples)} p50={cuts[49] * 1000:.0f}ms p95={cuts[94] * 1000:.0f}ms p99={cuts[98] * 1000:.0f}ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent BankID logins (initiate -> status long-poll -> collect) through the API. "
+        "Run the backend against `manage.py bankid_simulator` to measure collect fan-out and connection reuse. "
+        "With simulator latency (e.g. --latency 1), the peak of upstream calls in flight divided by --workers "
+        "shows how many logins each worker keeps going at once: compare the sync gunicorn service with the "
+        "uvicorn one (backend_asgi) by pointing --base-url at each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000/api/accounts/bankid/")
+        parser.add_argument("--orders", type=int, default=1000, help="Total orders to run")
+        parser.add_argument("--concurrency", type=int, default=200, help="Orders in flight at once")
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout (s)")
+        parser.add_argument("--workers", type=int, default=1, help="Backend worker processes serving --base-url")
+
+    def handle(self, *args, **options):
+        base_url = options["base_url"].rstrip("/") + "/"
+        stats_before = self._simulator_stats()
+
+        outcomes = Counter()
+        latencies = defaultdict(list)
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            futures = [pool.submit(self._run_order, base_url, options["timeout"]) for _ in range(options["orders"])]
+            for future in as_completed(futures):
+                outcome, timings = future.result()
+                outcomes[outcome] += 1
+                for step, seconds in timings:
+                    latencies[step].append(seconds)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['orders']} orders in {elapsed:.1f}s ({options['orders'] / elapsed:.1f} orders/s)"
+        ))
+        self.stdout.write(f"Outcomes: {dict(outcomes)}")
+        for step in ("initiate", "status", "collect", "total"):
+            self.stdout.write(f"  {step:<9} {_percentiles(latencies[step])}")
+
+        stats_after = self._simulator_stats()
+        if stats_before is not None and stats_after is not None:
+            calls = {
+                endpoint: count - stats_before["calls"].get(endpoint, 0)
+                for endpoint, count in stats_after["calls"].items()
+            }
+            connections = stats_after["connections"] - stats_before["connections"]
+            upstream = sum(calls.values())
+            self.stdout.write(f"Upstream calls: {calls}")
+            self.stdout.write(
+                f"  {calls.get('collect', 0) / max(options['orders'], 1):.1f} collects per order, "
+                f"{connections} TLS connections ({upstream / max(connections, 1):.0f} requests each)"
+            )
+            peak = stats_after["peak_in_flight"]
+            self.stdout.write(
+                f"  peak {peak} upstream calls in flight, {peak / max(options['workers'], 1):.1f} per worker"
+            )
+
+    def _run_order(self, base_url: str, timeout: float) -> tuple[str, list[tuple[str, float]]]:
+        """One browser: start an order, long-poll its status, then log in."""
+        session = requests.Session()
+        timings = []
+        order_started = time.perf_counter()
+
+        def timed(step, method, path, **kwargs):
+            t0 = time.perf_counter()
+            response = session.request(method, base_url + path, timeout=timeout, **kwargs)
+            timings.append((step, time.perf_counter() - t0))
+            return response
+
+        try:
+            response = timed("initiate", "POST", "initiate/", json={})
+            if response.status_code != 200:
+                return f"initiate_{response.status_code}", timings
+
+            since = 0
+            while True:
+                response = timed("status", "GET", "status/", params={"since": since})
+                if response.status_code != 200:
+                    return f"status_{response.status_code}", timings
+                state = response.json()
+                since = state["version"]
+                if state["status"] != "pending":
+                    break
+
+            if state["status"] != "complete":
+                return f"failed_{state['hintCode']}", timings
+
+            response = timed("collect", "POST", "collect/")
+            if response.status_code != 200 or response.json().get("status") != "complete":
+                return f"collect_{response.status_code}", timings
+
+            timings.append(("total", time.perf_counter() - order_started))
+            return "complete", timings
+
+        except requests.RequestException as e:
+            return type(e).__name__, timings
+        finally:
+            session.close()
+
+    def _simulator_stats(self) -> dict | None:
+        """Counters from the simulator at BANKID_API_URL, if that is what it points to."""
+        try:
+            response = httpx.get(f"{settings.BANKID_API_URL.rstrip('/')}/stats", verify=get_ssl_context(), timeout=5)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError):
+            self.stdout.write(self.style.WARNING("BANKID_API_URL is not the simulator; skipping upstream stats"))
+            return None
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.apps.accounts.bankid_simulator import (
+    BankIDSimulator,
+    generate_certificates,
+    parse_scenario_mix,
+)
+
+DEFAULT_CERTS_DIR = Path(settings.BASE_DIR) / "backend" / "secrets" / "bankid-simulator"
+
+
+class Command(BaseCommand):
+    help = "Run a local mutual-TLS stand-in for the BankID RP API with scripted order scenarios."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8443)
+        parser.add_argument("--certs-dir", default=str(DEFAULT_CERTS_DIR),
+                            help="Directory with ca.pem, server_*.pem and client_*.pem")
+        parser.add_argument("--generate-certs", action="store_true",
+                            help="(Re)generate the test CA and certificates before starting")
+        parser.add_argument("--scenario", default="success",
+                            help="Scenario mix, e.g. success=0.8,user_cancel=0.1,start_failed=0.1")
+        parser.add_argument("--latency", type=float, default=0, help="Added latency per request (ms)")
+        parser.add_argument("--jitter", type=float, default=0, help="Random extra latency up to this (ms)")
+        parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 503")
+        parser.add_argument("--speed", type=float, default=1, help="Run scenario timelines this many times faster")
+
+    def handle(self, *args, **options):
+        certs_dir = Path(options["certs_dir"])
+        if options["generate_certs"] or not (certs_dir / "ca.pem").exists():
+            generate_certificates(certs_dir, hosts=("localhost", options["host"]))
+            self.stdout.write(f"Generated test certificates in {certs_dir}")
+
+        try:
+            scenario_mix = parse_scenario_mix(options["scenario"])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        simulator = BankIDSimulator(
+            certs_dir,
+            host=options["host"],
+            port=options["port"],
+            scenario_mix=scenario_mix,
+            latency=options["latency"] / 1000,
+            jitter=options["jitter"] / 1000,
+            error_rate=options["error_rate"],
+            speed=options["speed"],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"BankID simulator listening on {simulator.url}"))
+        self.stdout.write("Point the backend at it with:")
+        self.stdout.write(f"  BANKID_API_URL={simulator.url}")
+        self.stdout.write(f"  BANKID_CERT_PATH={certs_dir / 'client_cert.pem'}")
+        self.stdout.write(f"  BANKID_KEY_PATH={certs_dir / 'client_key.pem'}")
+        self.stdout.write(f"  BANKID_CA_CERT_PATH={certs_dir / 'ca.pem'}")
+
+        try:
+            simulator.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.stop()
+            self.stdout.write(f"Stats: {simulator.state.stats()}")
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.apps.accounts.geoip import build_database
+
+
+class Command(BaseCommand):
+    help = "Compile a CSV IP-range dump (start_ip,end_ip,country[,city]) into the GeoIP lookup file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="CSV range dump to compile")
+        parser.add_argument("--output", default=settings.GEOIP_DB_PATH, help="Destination file (default: GEOIP_DB_PATH)")
+
+    def handle(self, *args, **options):
+        ipv4_count, ipv6_count = build_database(options["csv_path"], options["output"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {ipv4_count} IPv4 and {ipv6_count} IPv6 ranges to {options['output']}"
+        ))
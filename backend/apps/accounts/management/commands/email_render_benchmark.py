@@ -0,0 +1,86 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from backend.apps.accounts.emails import (
+    EMAIL_TEMPLATES,
+    QueuedEmail,
+    render_email,
+    render_emails,
+)
+from backend.apps.accounts.models import User
+
+
+def _contexts() -> dict[str, dict[str, Any]]:
+    """A realistic context for every account email."""
+    user = User(email="ada@example.com", first_name="Ada", last_name="Lovelace")
+    now = timezone.now()
+    contexts: dict[str, dict[str, Any]] = {
+        "accounts/account_locked": {"user": user, "locked_until": now},
+        "accounts/email_change_notification": {
+            "user": user, "old_email": "ada@example.com", "new_email": "ada.lovelace@example.com",
+        },
+        "accounts/new_login_detected": {
+            "user": user, "timestamp": now, "location": "Lund, Sweden", "device_type": "Desktop",
+            "browser": "Firefox 130", "ip_address": "203.0.113.7",
+        },
+        "accounts/password_changed": {"user": user},
+        "accounts/password_reset_notification": {"user": user},
+        "accounts/reset_password_email": {"user": user, "reset_url": "https://valunds.se/reset-password/abc"},
+        "accounts/verify_email": {"user": user, "verification_url": "https://valunds.se/verify-email/abc"},
+    }
+    missing = set(EMAIL_TEMPLATES) - set(contexts)
+    if missing:
+        raise CommandError(f"No benchmark context for {', '.join(sorted(missing))}")
+    return contexts
+
+
+def _stripped(name: str, context: dict) -> tuple[str, str]:
+    """How emails were rendered before the .txt companions: the HTML, then strip_tags over it."""
+    html = render_to_string(f"{name}.html", context)
+    return strip_tags(html), html
+
+
+def _html_only(name: str, context: dict) -> tuple[str, str]:
+    return "", render_to_string(f"{name}.html", context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-message cost of rendering the account emails: render_to_string plus strip_tags (the old path), "
+        "the HTML render alone, render_email with the precompiled .txt/.html pair, and render_emails over a "
+        "batch of all of them. Run with DEBUG off, as the compiled templates are only kept then."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=2000, help="Times to render every template")
+
+    def handle(self, *args, **options):
+        contexts = _contexts()
+        rounds = options["rounds"]
+
+        for label, render in (
+            ("render_to_string + strip_tags", _stripped),
+            ("render_to_string, html only", _html_only),
+            ("render_email (.txt + .html)", render_email),
+        ):
+            self._report(label, rounds, len(contexts), lambda render=render: [
+                render(name, context) for name, context in contexts.items()
+            ])
+
+        batch = [QueuedEmail(name, context, "Subject", "ada@example.com") for name, context in contexts.items()]
+        self._report(f"render_emails, batch of {len(batch)}", rounds, len(batch), lambda: render_emails(batch))
+
+    def _report(self, label: str, rounds: int, per_round: int, render_round: Callable[[], object]) -> None:
+        # One unmeasured round compiles the templates and fills the loader caches
+        render_round()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            render_round()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<32} {elapsed / (rounds * per_round) * 1e6:6.0f} us/msg")
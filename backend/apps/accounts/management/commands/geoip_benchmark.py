@@ -0,0 +1,101 @@
+import csv
+import ipaddress
+import os
+import random
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.apps.accounts.geoip import GeoIPDatabase, build_database
+
+
+def _write_synthetic_dump(path: Path, ipv4_ranges: int, ipv6_ranges: int, locations: int) -> None:
+    """Contiguous ranges covering all of IPv4 and the start of 2001::/16, cycling through ``locations``."""
+    ipv4_step = 2**32 // ipv4_ranges
+    ipv6_base = int(ipaddress.IPv6Address("2001::"))
+    ipv6_step = 2**96
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["start_ip", "end_ip", "country", "city"])
+        for n in range(ipv4_ranges):
+            start = n * ipv4_step
+            writer.writerow([
+                ipaddress.IPv4Address(start), ipaddress.IPv4Address(start + ipv4_step - 1),
+                f"C{n % 250}", f"City {n % locations}",
+            ])
+        for n in range(ipv6_ranges):
+            start = ipv6_base + n * ipv6_step
+            writer.writerow([
+                ipaddress.IPv6Address(start), ipaddress.IPv6Address(start + ipv6_step - 1),
+                f"C{n % 250}", f"City {n % locations}",
+            ])
+
+
+class Command(BaseCommand):
+    help = (
+        "Lookups per second against the GeoIP file, for random IPv4 and IPv6 addresses. Use --synthetic to "
+        "build a throwaway database of that many IPv4 ranges first, and --http-url (e.g. "
+        "'https://ipapi.co/{ip}/json/') to time an HTTP lookup service for comparison."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--db", default=settings.GEOIP_DB_PATH, help="GeoIP file (default: GEOIP_DB_PATH)")
+        parser.add_argument("--synthetic", type=int, metavar="IPV4_RANGES",
+                            help="Build and use a synthetic database with this many IPv4 ranges and a fifth as many IPv6")
+        parser.add_argument("--locations", type=int, default=50_000, help="Distinct locations in a synthetic database")
+        parser.add_argument("--lookups", type=int, default=200_000, help="Addresses to look up per family")
+        parser.add_argument("--http-url", help="URL template with an {ip} placeholder")
+        parser.add_argument("--http-lookups", type=int, default=2000, help="Addresses to look up over HTTP")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(options["db"])
+            if options["synthetic"]:
+                db_path = self._build_synthetic(Path(tmp_dir), options["synthetic"], options["locations"])
+            elif not db_path.exists():
+                raise CommandError(f"No GeoIP database at {db_path}; build one or pass --synthetic")
+
+            database = GeoIPDatabase(db_path)
+            ipv4 = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(options["lookups"])]
+            # Global unicast, which is where both real and synthetic IPv6 ranges sit
+            ipv6 = [str(ipaddress.IPv6Address((1 << 125) | rng.getrandbits(125))) for _ in range(options["lookups"])]
+            self._report("mmap IPv4", ipv4, database.lookup)
+            self._report("mmap IPv6", ipv6, database.lookup)
+
+        if options["http_url"]:
+            addresses = ipv4[:options["http_lookups"]]
+            self._report("HTTP, request per lookup", addresses, lambda ip: requests.get(
+                options["http_url"].format(ip=ip), timeout=5,
+            ).json())
+            with requests.Session() as session:
+                self._report("HTTP, keep-alive session", addresses, lambda ip: session.get(
+                    options["http_url"].format(ip=ip), timeout=5,
+                ).json())
+
+    def _build_synthetic(self, tmp_dir: Path, ipv4_ranges: int, locations: int) -> Path:
+        csv_path, db_path = tmp_dir / "ranges.csv", tmp_dir / "geoip.bin"
+        _write_synthetic_dump(csv_path, ipv4_ranges, ipv4_ranges // 5, locations)
+        started = time.perf_counter()
+        ipv4_count, ipv6_count = build_database(csv_path, db_path)
+        self.stdout.write(
+            f"Built {ipv4_count} IPv4 and {ipv6_count} IPv6 ranges in {time.perf_counter() - started:.1f}s, "
+            f"{os.path.getsize(db_path) / 1e6:.1f} MB"
+        )
+        return db_path
+
+    def _report(self, label: str, addresses: list[str], lookup: Callable[[str], object]) -> None:
+        started = time.perf_counter()
+        for address in addresses:
+            lookup(address)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<26} {len(addresses) / elapsed:10,.0f} lookups/s  {elapsed / len(addresses) * 1e6:8.1f} us/lookup"
+        )
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.apps.accounts.partitions import maintain_partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions for the audit tables and drop expired ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=settings.AUDIT_PARTITIONS_AHEAD,
+                            help="Months of future partitions to keep ready")
+        parser.add_argument("--retention", type=int, default=settings.AUDIT_RETENTION_MONTHS,
+                            help="Drop partitions older than this many months")
+
+    def handle(self, *args, **options):
+        report = maintain_partitions(months_ahead=options["ahead"], retention_months=options["retention"])
+        if not report:
+            self.stdout.write("No partitioned tables (PostgreSQL only)")
+        for table, changes in report.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: created {len(changes['created'])}, dropped {len(changes['dropped'])}"
+            ))
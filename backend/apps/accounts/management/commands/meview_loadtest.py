@@ -0,0 +1,80 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.apps.accounts.models import User
+from backend.apps.accounts.user_cache import user_cache
+
+
+def _percentiles(samples: list[float]) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"p50={cuts[49] * 1000:.1f}ms p95={cuts[94] * 1000:.1f}ms p99={cuts[98] * 1000:.1f}ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests per second on MeView (GET /api/accounts/me/) of a running backend, with one signed-in user per "
+        "concurrent client. Compare database settings by restarting the backend between runs, e.g. "
+        "DATABASE_POOL_MODE=pool against DATABASE_POOL_MODE=persistent DATABASE_CONN_MAX_AGE=0 (a new "
+        "connection per request). With a warm user cache MeView makes no query at all, so use --cold-user-cache "
+        "to move each user to a new cache version before every request and make the backend read the user row. "
+        "That needs this command to share the backend's cache, as it does with Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000/api/accounts/me/")
+        parser.add_argument("--requests", type=int, default=5000, help="Total requests to send")
+        parser.add_argument("--concurrency", type=int, default=8, help="Clients sending requests at once")
+        parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per client")
+        parser.add_argument("--cold-user-cache", action="store_true",
+                            help="Bump the user's cache version before each request")
+
+    def handle(self, *args, **options):
+        users = self._users(options["concurrency"])
+        per_client = options["requests"] // options["concurrency"]
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            list(pool.map(lambda user: self._client(options["url"], user, options["warmup"], False), users))
+
+            started = time.perf_counter()
+            results = list(pool.map(
+                lambda user: self._client(options["url"], user, per_client, options["cold_user_cache"]), users,
+            ))
+            elapsed = time.perf_counter() - started
+
+        latencies = [seconds for client in results for seconds in client]
+        total = len(latencies)
+        cache_state = "cold" if options["cold_user_cache"] else "warm"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} requests ({cache_state} user cache) in {elapsed:.1f}s: {total / elapsed:.0f} req/s"
+        ))
+        self.stdout.write(f"  mean={statistics.mean(latencies) * 1000:.1f}ms {_percentiles(latencies)}")
+
+    def _users(self, count: int) -> list[User]:
+        users = []
+        for n in range(count):
+            user, _ = User.objects.get_or_create(
+                email=f"meview-loadtest-{n}@example.com",
+                defaults={"username": f"meview-loadtest-{n}", "email_verified": True},
+            )
+            users.append(user)
+        return users
+
+    def _client(self, url: str, user: User, count: int, cold: bool) -> list[float]:
+        """One signed-in browser calling MeView ``count`` times over a keep-alive session."""
+        latencies = []
+        with requests.Session() as session:
+            session.headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+            for _ in range(count):
+                if cold:
+                    user_cache.bump(user.pk)
+                started = time.perf_counter()
+                response = session.get(url, timeout=10)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"MeView answered {response.status_code}: {response.text[:200]}")
+        return latencies
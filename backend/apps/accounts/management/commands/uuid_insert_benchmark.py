@@ -0,0 +1,85 @@
+import time
+import uuid
+from collections.abc import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from backend.apps.accounts.ids import uuid7
+
+KEY_KINDS: dict[str, Callable[[], uuid.UUID]] = {"v4": uuid.uuid4, "v7": uuid7}
+
+TABLE = "uuid_insert_benchmark_{kind}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert throughput, primary-key index size and WAL volume for uuid4 vs uuid7 keys on PostgreSQL. Rows "
+        "are shaped like login_history and go in through COPY, --batch rows per transaction, into a scratch "
+        "table that is dropped afterwards. Keys are generated in Python, so uuid7's slower generation counts "
+        "against it. Use a few million rows so the index outgrows shared_buffers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=3_000_000)
+        parser.add_argument("--batch", type=int, default=5000, help="Rows per transaction")
+        parser.add_argument("--kinds", nargs="+", choices=sorted(KEY_KINDS), default=["v4", "v7"],
+                            help="Key kinds to run, in order; repeat or reverse to check for ordering effects")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("uuid_insert_benchmark needs PostgreSQL")
+
+        for kind in options["kinds"]:
+            self._run(kind, options["rows"], options["batch"])
+
+    def _run(self, kind: str, rows: int, batch: int) -> None:
+        table = TABLE.format(kind=kind)
+        make_key = KEY_KINDS[kind]
+        user_ids = [uuid.uuid4() for _ in range(1000)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TABLE {table} (id uuid PRIMARY KEY, user_id uuid NOT NULL, "
+                "timestamp timestamptz NOT NULL, ip_address inet NOT NULL, user_agent text NOT NULL)"
+            )
+            try:
+                # Start from a clean checkpoint so both kinds pay for the same full-page writes
+                cursor.execute("CHECKPOINT")
+            except DatabaseError:
+                self.stdout.write(self.style.WARNING("CHECKPOINT not permitted; WAL figures include earlier writes"))
+            cursor.execute("SELECT pg_current_wal_lsn()")
+            wal_start = cursor.fetchone()[0]
+
+        per_million = []
+        started = million_started = time.perf_counter()
+        try:
+            for offset in range(0, rows, batch):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    now = timezone.now()
+                    with cursor.copy(f"COPY {table} (id, user_id, timestamp, ip_address, user_agent) FROM STDIN") as copy:
+                        for n in range(min(batch, rows - offset)):
+                            copy.write_row((make_key(), user_ids[n % 1000], now, "203.0.113.7", "Mozilla/5.0"))
+                if (offset + batch) % 1_000_000 == 0:
+                    lap = time.perf_counter()
+                    per_million.append(1_000_000 / (lap - million_started))
+                    million_started = lap
+            elapsed = time.perf_counter() - started
+
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", [wal_start])
+                wal = cursor.fetchone()[0]
+                cursor.execute(f"SELECT pg_relation_size('{table}_pkey'), pg_relation_size('{table}')")
+                index_size, heap_size = cursor.fetchone()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+        millions = " / ".join(f"{rate / 1000:.0f}k" for rate in per_million)
+        self.stdout.write(
+            f"uuid{kind[1:]}: {rows:,} rows in {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s"
+            + (f" (per million: {millions})" if millions else "")
+            + f"; pkey {index_size / 2**20:.0f} MB, heap {heap_size / 2**20:.0f} MB, WAL {wal / 2**20:.0f} MB"
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from backend.apps.accounts.security_utils import warm_user_agent_cache
+
+
+class Command(BaseCommand):
+    help = "Parse the most frequent user agents in LoginHistory into the shared user-agent cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Number of distinct user agents to warm")
+
+    def handle(self, *args, **options):
+        count = warm_user_agent_cache(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Cached {count} user agents"))
@@ -0,0 +1,34 @@
+"""
+Prometheus metrics for the accounts app, exposed through django_prometheus at /metrics/.
+"""
+from prometheus_client import Counter, Histogram
+
+user_agent_cache_requests = Counter(
+    "accounts_user_agent_cache_requests_total",
+    "User-agent parse cache lookups by result",
+    ["result"],  # local_hit, shared_hit, miss
+)
+
+user_agent_cache_evictions = Counter(
+    "accounts_user_agent_cache_evictions_total",
+    "User-agent entries evicted from the in-process LRU",
+)
+
+recaptcha_verify_seconds = Histogram(
+    "accounts_recaptcha_verify_seconds",
+    "Latency of reCAPTCHA siteverify calls by outcome",
+    ["outcome"],  # valid, invalid, error
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0),
+)
+
+recaptcha_verifications = Counter(
+    "accounts_recaptcha_verifications_total",
+    "reCAPTCHA verifications by result",
+    ["result"],  # cached, valid, invalid, error
+)
+
+user_cache_requests = Counter(
+    "accounts_user_cache_requests_total",
+    "Authenticated-user cache lookups by result",
+    ["result"],  # local_hit, shared_hit, miss
+)
@@ -1,7 +1,8 @@
 # Generated by Django 5.2.6 on 2025-10-06 19:33
 
-import django.db.models.deletion
 import uuid
+
+import django.db.models.deletion
 from django.conf import settings
 from django.db import migrations, models
 
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:40
+
+import hashlib
+import uuid
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_known_devices(apps, schema_editor):
+    """Seed known devices from the last 30 days of successful logins."""
+    LoginHistory = apps.get_model('accounts', 'LoginHistory')
+    KnownDevice = apps.get_model('accounts', 'KnownDevice')
+
+    cutoff = django.utils.timezone.now() - timedelta(days=30)
+    recent = (
+        LoginHistory.objects.filter(success=True, timestamp__gte=cutoff)
+        .values('user_id', 'ip_address', 'browser', 'os')
+        .annotate(last_seen=models.Max('timestamp'))
+    )
+
+    devices = {}
+    for row in recent.iterator():
+        for source in (f"ip:{row['ip_address']}", f"ua:{row['browser']}|{row['os']}"):
+            key = (row['user_id'], hashlib.sha256(source.encode()).hexdigest())
+            devices[key] = max(devices.get(key, row['last_seen']), row['last_seen'])
+
+    KnownDevice.objects.bulk_create(
+        [
+            KnownDevice(user_id=user_id, fingerprint=fingerprint, last_seen=last_seen)
+            for (user_id, fingerprint), last_seen in devices.items()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnownDevice',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(help_text='SHA-256 of the IP or browser/OS', max_length=64)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='known_devices', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'known_devices',
+                'constraints': [models.UniqueConstraint(fields=('user', 'fingerprint'), name='known_devices_user_fingerprint_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_known_devices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Converts login_history and security_events into PostgreSQL tables
+# range-partitioned by month on "timestamp". No-op on other databases.
+
+from datetime import UTC, date, datetime
+
+from django.db import migrations
+
+TABLES = ('login_history', 'security_events')
+MONTHS_AHEAD = 3
+
+
+def _month(value, offset=0):
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=UTC)
+
+
+def partition_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+            if cursor.fetchone():
+                continue
+
+            # Capture secondary indexes and foreign keys to recreate on the new parent
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+                "AND tablename = %s AND indexname <> %s",
+                [table, f'{table}_pkey'],
+            )
+            index_definitions = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+                [table],
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute(f'SELECT min("timestamp") FROM "{table}"')
+            oldest = cursor.fetchone()[0]
+
+            old_table = f'{table}_unpartitioned'
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old_table}"')
+            # Free the primary key's name for the new table
+            cursor.execute(f'ALTER TABLE "{old_table}" RENAME CONSTRAINT "{table}_pkey" TO "{old_table}_pkey"')
+            cursor.execute(
+                f'CREATE TABLE "{table}" (LIKE "{old_table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                f'PARTITION BY RANGE ("timestamp")'
+            )
+            # The partition key must be part of the primary key; id alone stays unique in practice
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id, "timestamp")')
+
+            now = datetime.now(UTC).date()
+            month = _month(oldest or now)
+            while month <= _month(now, MONTHS_AHEAD):
+                cursor.execute(
+                    f'CREATE TABLE "{table}_p{month:%Y_%m}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                    [_bound(month), _bound(_month(month, 1))],
+                )
+                month = _month(month, 1)
+            # Catches rows outside the monthly partitions instead of failing the insert
+            cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+            cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old_table}"')
+            cursor.execute(f'DROP TABLE "{old_table}"')
+
+            for definition in index_definitions:
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_alter_loginhistory_timestamp_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
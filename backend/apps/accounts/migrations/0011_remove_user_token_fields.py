@@ -0,0 +1,34 @@
+# Verification and password-reset tokens are signed (see tokens.py) and no
+# longer stored on the user.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_partition_audit_tables'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_verific_ccfceb_idx',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='verification_token',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='verification_token_created',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='password_reset_token',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='password_reset_token_created',
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Index audit: drop indexes duplicated by unique constraints or by composite
+# indexes that lead with the same column, and replace low-selectivity ones
+# with partial indexes.
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_remove_user_token_fields'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_email_4b85f2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_bankid__c54fe2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('account_locked_until__isnull', False)), fields=['account_locked_until'], name='users_locked_until_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='loginhistory',
+            name='login_histo_flagged_0a21a1_idx',
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='login_history', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['user', 'success', '-timestamp'], name='login_history_user_success_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(condition=models.Q(('flagged_as_suspicious', True)), fields=['-timestamp'], name='login_history_flagged_idx'),
+        ),
+        migrations.AlterField(
+            model_name='securityevent',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='security_events', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveIndex(
+            model_name='outboundemail',
+            name='email_outbo_status_c5a6aa_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboundemail',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='email_outbox_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# New rows get time-ordered UUIDv7 keys. Existing uuid4 keys are left as they
+# are: both are plain UUIDs in the same column, rewriting primary keys would
+# invalidate issued JWTs (which carry the user id), and the old keys simply
+# sort before or among the new ones.
+
+from django.db import migrations, models
+
+import backend.apps.accounts.ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_rework_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=backend.apps.accounts.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='id',
+            field=models.UUIDField(default=backend.apps.accounts.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='securityevent',
+            name='id',
+            field=models.UUIDField(default=backend.apps.accounts.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
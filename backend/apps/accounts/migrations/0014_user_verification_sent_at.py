@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_uuid7_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='verification_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
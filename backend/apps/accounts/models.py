@@ -2,20 +2,23 @@ import uuid
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .ids import uuid7
+
 
 class User(AbstractUser):
     """Custom user with UUID primary key and profile/security fields."""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Time-ordered keys, so inserts append to the primary-key index (see ids.py)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     email = models.EmailField(_("email address"), unique=True)
 
+    # Verification and reset links carry signed tokens, see tokens.py
     email_verified = models.BooleanField(default=False)
-    verification_token = models.CharField(max_length=64, blank=True, null=True)
-    verification_token_created = models.DateTimeField(blank=True, null=True)
-
-    password_reset_token = models.CharField(max_length=64, blank=True, null=True)
-    password_reset_token_created = models.DateTimeField(blank=True, null=True)
+    # Stamped on each verification link sent, so a resend supersedes earlier links
+    verification_sent_at = models.DateTimeField(blank=True, null=True)
 
     failed_login_attempts = models.IntegerField(default=0)
     last_failed_login = models.DateTimeField(blank=True, null=True)
@@ -56,13 +59,17 @@ class User(AbstractUser):
 
     class Meta:
         db_table = "users"
+        # email and bankid_personal_number are indexed by their unique constraints
         indexes = [
-            models.Index(fields=["email"]),
             models.Index(fields=["user_type"]),
-            models.Index(fields=["verification_token"]),
             models.Index(fields=["city"]),
             models.Index(fields=["last_login_ip"]),
-            models.Index(fields=["bankid_personal_number"]),
+            # Only locked accounts, for the admin's locked filter
+            models.Index(
+                fields=["account_locked_until"],
+                name="users_locked_until_idx",
+                condition=Q(account_locked_until__isnull=False),
+            ),
         ]
 
     def __str__(self):
@@ -76,10 +83,12 @@ class User(AbstractUser):
 
 class LoginHistory(models.Model):
     """Record of login attempts."""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history')
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # Covered by the (user, timestamp) indexes
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history', db_index=False)
 
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the event happens, not when a buffered write reaches the database
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     ip_address = models.GenericIPAddressField()
     user_agent = models.CharField(max_length=512)
 
@@ -94,12 +103,21 @@ class LoginHistory(models.Model):
     notification_sent = models.BooleanField(default=False)
 
     class Meta:
+        # Range-partitioned by month on PostgreSQL, see partitions.py
         db_table = "login_history"
         ordering = ["-timestamp"]
         indexes = [
             models.Index(fields=["user", "-timestamp"]),
+            # A user's recent successful or failed logins (the admin's 30-day counts);
+            # test_query_plans checks both counts are planned on it
+            models.Index(fields=["user", "success", "-timestamp"], name="login_history_user_success_idx"),
             models.Index(fields=["ip_address"]),
-            models.Index(fields=["flagged_as_suspicious"]),
+            # Flagged rows are rare; index only those instead of the boolean
+            models.Index(
+                fields=["-timestamp"],
+                name="login_history_flagged_idx",
+                condition=Q(flagged_as_suspicious=True),
+            ),
         ]
 
     def __str__(self):
@@ -116,10 +134,12 @@ class SecurityEvent(models.Model):
         ACCOUNT_RECOVERY = "account_recovery", _("Account Recovery Attempted")
         SUSPICIOUS_LOGIN = "suspicious_login", _("Suspicious Login Attempt")
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='security_events')
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # Covered by the (user, timestamp) index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='security_events', db_index=False)
     event_type = models.CharField(max_length=30, choices=EventType.choices)
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the event happens, not when a buffered write reaches the database
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
 
     ip_address = models.GenericIPAddressField(blank=True, null=True)
     user_agent = models.CharField(max_length=512, blank=True)
@@ -128,6 +148,7 @@ class SecurityEvent(models.Model):
     notification_sent = models.BooleanField(default=False)
 
     class Meta:
+        # Range-partitioned by month on PostgreSQL, see partitions.py
         db_table = "security_events"
         ordering = ["-timestamp"]
         indexes = [
@@ -137,3 +158,58 @@ class SecurityEvent(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.event_type} - {self.timestamp}"
+
+
+class KnownDevice(models.Model):
+    """Fingerprint of an IP or browser/OS a user has successfully logged in from."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Covered by the (user, fingerprint) unique constraint
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='known_devices', db_index=False)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the IP or browser/OS")
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "known_devices"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "fingerprint"], name="known_devices_user_fingerprint_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.fingerprint[:12]} - {self.last_seen}"
+
+
+class OutboundEmail(models.Model):
+    """Transactional outbox of account emails, drained by a Celery worker."""
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        SENT = "sent", _("Sent")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "email_outbox"
+        ordering = ["created_at"]
+        indexes = [
+            # Only the drain's pending rows; sent mail stays out of the index
+            models.Index(
+                fields=["next_attempt_at"],
+                name="email_outbox_pending_idx",
+                condition=Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject} - {self.status}"
@@ -1,15 +1,18 @@
+import logging
 from urllib.parse import urlencode
 
-import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.shortcuts import redirect
+from django.views import View
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .google_oauth import GoogleAuthError, aexchange_code, verify_id_token
 from .models import User
-from .security_utils import track_login_attempt
-from .views import set_auth_cookies
+from .views import complete_login, set_auth_cookies
+
+logger = logging.getLogger(__name__)
 
 
 class GoogleLoginInitiateView(APIView):
@@ -45,24 +48,29 @@ class GoogleLoginInitiateView(APIView):
         return redirect(auth_url)
 
 
-class GoogleLoginCallbackView(APIView):
-    """Handle Google OAuth callback: exchange code for tokens, create/login user."""
-    permission_classes = [AllowAny]
+class GoogleLoginCallbackView(View):
+    """
+    Handle Google OAuth callback: exchange code for tokens, create/login user.
 
-    def get(self, request):
+    The user's identity comes from the id_token in the token response,
+    verified locally against Google's cached signing keys, so the only
+    upstream call is the code exchange. The view is async so that call
+    doesn't hold a worker under the ASGI deployment.
+    """
+    http_method_names = ['get']
+
+    async def get(self, request):
         try:
             # Get authorization code from Google
             code = request.GET.get('code')
             error = request.GET.get('error')
 
-            print(f"🔍 OAuth Callback - Code: {bool(code)}, Error: {error}")
-
             if error:
-                print(f"❌ OAuth Error: {error}")
+                logger.info(f"Google OAuth cancelled: {error}")
                 return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_cancelled")
 
             if not code:
-                print("❌ No authorization code")
+                logger.warning("Google OAuth callback without authorization code")
                 return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_failed")
 
             # Get Google credentials
@@ -70,69 +78,34 @@ class GoogleLoginCallbackView(APIView):
             client_id = google_config.get('client_id', '')
             client_secret = google_config.get('secret', '')
 
-            print(f"🔍 Client ID configured: {bool(client_id)}")
-            print(f"🔍 Client Secret configured: {bool(client_secret)}")
-
             if not client_id or not client_secret:
-                print("❌ Missing OAuth credentials")
+                logger.error("Google OAuth credentials are not configured")
                 return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_not_configured")
 
             # Build callback URL (must match the one sent to Google)
             callback_url = f"{request.scheme}://{request.get_host()}/api/accounts/oauth/google/callback/"
-            print(f"🔍 Callback URL: {callback_url}")
-
-            # Exchange authorization code for access token
-            token_url = "https://oauth2.googleapis.com/token"
-            token_data = {
-                "code": code,
-                "client_id": client_id,
-                "client_secret": client_secret,
-                "redirect_uri": callback_url,
-                "grant_type": "authorization_code",
-            }
-
-            print("🔍 Exchanging code for token...")
-            token_response = requests.post(token_url, data=token_data, timeout=10)
-
-            print(f"🔍 Token response status: {token_response.status_code}")
-
-            if token_response.status_code != 200:
-                print(f"❌ Token exchange failed: {token_response.text}")
-                return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_error")
-
-            token_response.raise_for_status()
-            tokens = token_response.json()
-            access_token = tokens.get('access_token')
-
-            print(f"🔍 Access token received: {bool(access_token)}")
-
-            # Get user info from Google
-            userinfo_url = "https://www.googleapis.com/oauth2/v2/userinfo"
-            userinfo_response = requests.get(
-                userinfo_url,
-                headers={"Authorization": f"Bearer {access_token}"},
-                timeout=10
-            )
 
-            print(f"🔍 Userinfo response status: {userinfo_response.status_code}")
-
-            if userinfo_response.status_code != 200:
-                print(f"❌ Userinfo request failed: {userinfo_response.text}")
-                return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_error")
-
-            userinfo_response.raise_for_status()
-            user_data = userinfo_response.json()
+            # Exchange authorization code for tokens, then verify the id_token locally
+            tokens = await aexchange_code(code, client_id, client_secret, callback_url)
+            if 'id_token' not in tokens:
+                raise GoogleAuthError("Token response has no id_token")
+            # Only blocks when the signing keys need refetching, so off the event loop
+            user_data = await sync_to_async(verify_id_token, thread_sensitive=False)(tokens['id_token'], client_id)
 
             # Extract user information
             email = user_data.get('email')
-            print(f"🔍 User email: {email}")
 
             if not email:
-                print("❌ No email in user data")
+                logger.warning("Google id_token has no email claim")
                 return redirect(f"{settings.FRONTEND_URL}/login?error=no_email")
 
+            if not user_data.get('email_verified'):
+                # Linking on an unverified address would let it take over an existing account
+                logger.warning(f"Google email not verified: {email}")
+                return redirect(f"{settings.FRONTEND_URL}/login?error=email_not_verified")
+
             # Get or create user
-            user, created = User.objects.get_or_create(
+            user, created = await User.objects.aget_or_create(
                 email=email,
                 defaults={
                     'username': email,
@@ -143,33 +116,21 @@ class GoogleLoginCallbackView(APIView):
                 }
             )
 
-            print(f"🔍 User {'created' if created else 'exists'}: {user.email}")
-
             # Update existing user's verification status
             if not created and not user.email_verified:
                 user.email_verified = True
-                user.save(update_fields=['email_verified'])
+                await user.asave(update_fields=['email_verified'])
 
             # Check if account is active
             if not user.is_active:
-                print(f"❌ Account inactive: {user.email}")
+                logger.warning(f"Google login for inactive account: {user.email}")
                 return redirect(f"{settings.FRONTEND_URL}/login?error=account_inactive")
 
-            # Track successful login
-            track_login_attempt(user, request, success=True)
-
-            # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
-            jwt_tokens = {
-                "refresh": str(refresh),
-                "access": str(refresh.access_token)
-            }
-
-            print(f"✅ JWT tokens generated for: {user.email}")
+            # Track successful login and generate JWT tokens
+            jwt_tokens = await sync_to_async(complete_login)(user, request)
 
             # ✅ Redirect to frontend WITHOUT tokens in URL
             frontend_callback = f"{settings.FRONTEND_URL}/oauth/callback"
-            print(f"✅ Redirecting to: {frontend_callback}")
 
             response = redirect(frontend_callback)
 
@@ -187,19 +148,14 @@ class GoogleLoginCallbackView(APIView):
                 path="/"
             )
 
-            print(f"✅ OAuth flow complete for: {user.email}")
+            logger.info(f"Google OAuth login {'(new user) ' if created else ''}for: {user.email}")
             return response
 
-        except requests.RequestException as e:
-            # Log the error for debugging
-            print(f"❌ OAuth RequestException: {e}")
-            import traceback
-            traceback.print_exc()
+        except GoogleAuthError as e:
+            logger.warning(f"Google OAuth failed: {e}")
             return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_error")
 
-        except Exception as e:
-            # Log unexpected errors
-            print(f"❌ Unexpected OAuth error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Unexpected Google OAuth error")
             return redirect(f"{settings.FRONTEND_URL}/login?error=oauth_error")
+
@@ -0,0 +1,146 @@
+"""
+Monthly range partitions for the append-only audit tables.
+
+On PostgreSQL, ``login_history`` and ``security_events`` are declaratively
+partitioned on ``timestamp`` with one partition per calendar month (see
+migration 0010). Queries over a recent window only touch the one or two
+partitions that cover it, and retention is a ``DROP TABLE`` of whole months
+instead of a bulk DELETE.
+
+Partitions should exist before rows for that month arrive, so
+``maintain_partitions`` creates upcoming months ahead of time; it runs daily
+from Celery beat and via ``manage.py manage_partitions``. Rows for a month
+that has no partition yet land in the table's ``_default`` partition instead
+of failing, and are moved into the month's partition when it is created. On
+other database backends the tables are ordinary tables and these functions
+do nothing.
+"""
+import logging
+import re
+from datetime import UTC, date, datetime
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("login_history", "security_events")
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(value: date, offset: int = 0) -> date:
+    """First day of the month ``offset`` months after ``value``."""
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def is_partitioned(table: str) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table: str) -> list[tuple[str, date]]:
+    """Return (partition name, month) for the table's monthly partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partitions(table: str, first_month: date, last_month: date) -> list[str]:
+    """Create any missing monthly partitions from ``first_month`` through ``last_month``."""
+    existing = {month for _, month in list_partitions(table)}
+    created = []
+
+    month = month_start(first_month)
+    with connection.cursor() as cursor:
+        while month <= last_month:
+            if month not in existing:
+                name = partition_name(table, month)
+                lower = datetime(month.year, month.month, 1, tzinfo=UTC)
+                upper_month = month_start(month, 1)
+                upper = datetime(upper_month.year, upper_month.month, 1, tzinfo=UTC)
+                with transaction.atomic():
+                    # Attaching the range fails while the default partition holds
+                    # rows in it, so move them into the new partition first
+                    cursor.execute(
+                        f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+                    )
+                    cursor.execute(
+                        f'WITH moved AS (DELETE FROM "{default_partition_name(table)}" '
+                        f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+                        f'INSERT INTO "{name}" SELECT * FROM moved',
+                        [lower, upper],
+                    )
+                    cursor.execute(
+                        f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+                        [lower, upper],
+                    )
+                created.append(name)
+            month = month_start(month, 1)
+
+    return created
+
+
+def drop_partitions_before(table: str, cutoff_month: date) -> list[str]:
+    """Drop whole monthly partitions that end on or before ``cutoff_month``."""
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, month in list_partitions(table):
+            if month_start(month, 1) <= cutoff_month:
+                cursor.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(months_ahead: int = 3, retention_months: int | None = None) -> dict[str, dict[str, list[str]]]:
+    """
+    Create partitions through ``months_ahead`` months from now and, if
+    ``retention_months`` is set, drop partitions older than that many months.
+    """
+    today = datetime.now(UTC).date()
+    report = {}
+
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+
+        created = create_partitions(table, month_start(today), month_start(today, months_ahead))
+        dropped = []
+        if retention_months is not None:
+            dropped = drop_partitions_before(table, month_start(today, -retention_months))
+
+        if created or dropped:
+            logger.info(f"Partitions for {table}: created {created}, dropped {dropped}")
+        report[table] = {"created": created, "dropped": dropped}
+
+    return report
@@ -1,18 +1,29 @@
 """
 Utility functions for security event tracking and notifications
 """
+import hashlib
 import logging
+from datetime import timedelta
 
-from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
-from django.utils.html import strip_tags
 from ipware import get_client_ip as ipware_get_ip
 from user_agents import parse
 
+from .audit import audit_log
+from .emails import queue_email
+from .geoip import lookup_location
+from .ua_cache import normalize_user_agent, user_agent_cache
+
 logger = logging.getLogger(__name__)
 
+# New-device detection
+KNOWN_DEVICE_WINDOW = timedelta(days=30)
+KNOWN_DEVICE_TOUCH_INTERVAL = timedelta(days=1)
+KNOWN_DEVICES_CACHE_KEY = "known_devices:v1:{user_id}"
+KNOWN_DEVICES_CACHE_TIMEOUT = 24 * 60 * 60
+
 
 def get_client_ip(request) -> str:
     """
@@ -26,7 +37,19 @@ def get_client_ip(request) -> str:
 def parse_user_agent(user_agent_string: str) -> dict[str, str]:
     """
     Parse user agent string to extract device, browser, OS info
+    Results are served from the user-agent cache after the first parse
     """
+    key = normalize_user_agent(user_agent_string)
+
+    device_info = user_agent_cache.get(key)
+    if device_info is None:
+        device_info = _parse_user_agent(key)
+        user_agent_cache.set(key, device_info)
+
+    return dict(device_info)
+
+
+def _parse_user_agent(user_agent_string: str) -> dict[str, str]:
     try:
         ua = parse(user_agent_string)
 
@@ -54,76 +77,146 @@ def parse_user_agent(user_agent_string: str) -> dict[str, str]:
         }
 
 
+def warm_user_agent_cache(limit: int = 500) -> int:
+    """
+    Pre-parse the most frequent user agents from LoginHistory into the cache
+    Returns the number of user agents cached
+    """
+    from django.db.models import Count
+
+    from .models import LoginHistory
+
+    frequent = (
+        LoginHistory.objects.values('user_agent')
+        .annotate(logins=Count('id'))
+        .order_by('-logins')[:limit]
+    )
+
+    parsed = {}
+    for row in frequent:
+        key = normalize_user_agent(row['user_agent'])
+        parsed[key] = _parse_user_agent(key)
+
+    user_agent_cache.set_many(parsed)
+    return len(parsed)
+
+
 def get_location_from_ip(ip_address: str) -> str:
     """
     Get approximate location from IP address
 
-    MVP: Returns placeholder values. GeoIP not implemented to avoid complexity.
-    Location data will show as "Local Development" or "Unknown Location" in:
-    - LoginHistory.location field
-    - User.last_login_location field
-    - Email notifications
-
-    Future enhancement options:
-    - MaxMind GeoLite2 (adds ~10MB database file)
-    - External API like ipapi.co (adds HTTP overhead)
+    Uses the offline range database built by `manage.py build_geoip_db`
+    (see geoip.py). Returns "City, Country", "Local Development" for
+    loopback addresses, or "" when the address is unknown or no database
+    is installed.
     """
     if ip_address.startswith('127.') or ip_address == '::1':
         return "Local Development"
-    return ""
+    return lookup_location(ip_address)
+
+
+def device_fingerprints(device_info: dict[str, str], ip_address: str) -> list[str]:
+    """
+    Fingerprints a login is matched on: its IP and its browser+OS
+    A device counts as known if either has been seen recently
+    """
+    sources = [
+        f"ip:{ip_address}",
+        f"ua:{device_info.get('browser')}|{device_info.get('os')}",
+    ]
+    return [hashlib.sha256(source.encode()).hexdigest() for source in sources]
+
+
+def get_known_devices(user) -> dict[str, float]:
+    """
+    Return {fingerprint: last_seen timestamp} for the user's recent devices
+    Served from the shared cache; loaded from KnownDevice on a miss
+    """
+    from .models import KnownDevice
+
+    cache_key = KNOWN_DEVICES_CACHE_KEY.format(user_id=user.pk)
+    devices = cache.get(cache_key)
+
+    if devices is None:
+        cutoff = timezone.now() - KNOWN_DEVICE_WINDOW
+        devices = {
+            fingerprint: last_seen.timestamp()
+            for fingerprint, last_seen in KnownDevice.objects.filter(
+                user=user, last_seen__gte=cutoff
+            ).values_list('fingerprint', 'last_seen')
+        }
+        cache.set(cache_key, devices, KNOWN_DEVICES_CACHE_TIMEOUT)
+
+    return devices
 
 
 def is_new_device(user, device_info: dict[str, str], ip_address: str) -> bool:
     """
     Check if this is a new device/location for the user
     """
-    from .models import LoginHistory
+    devices = get_known_devices(user)
+    cutoff = (timezone.now() - KNOWN_DEVICE_WINDOW).timestamp()
 
-    # Check if we have any previous successful logins from this IP or device
-    recent_logins = LoginHistory.objects.filter(
-        user=user,
-        success=True,
-        timestamp__gte=timezone.now() - timezone.timedelta(days=30)
+    # New only if neither the IP nor the browser+OS was seen in the window
+    return not any(
+        devices.get(fingerprint, 0) >= cutoff
+        for fingerprint in device_fingerprints(device_info, ip_address)
     )
 
-    # Return True only if there are no recent logins from the same IP or same browser+OS
-    return not (
-        recent_logins.filter(ip_address=ip_address).exists()
-        or recent_logins.filter(
-            browser=device_info.get('browser'),
-            os=device_info.get('os')
-        ).exists()
+
+def remember_device(user, device_info: dict[str, str], ip_address: str):
+    """
+    Record a successful login's fingerprints as known for the user
+    Rows seen within KNOWN_DEVICE_TOUCH_INTERVAL are left alone to avoid a write per login
+    """
+    from .models import KnownDevice
+
+    devices = get_known_devices(user)
+    now = timezone.now()
+    stale_before = (now - KNOWN_DEVICE_TOUCH_INTERVAL).timestamp()
+
+    fingerprints = [
+        fingerprint for fingerprint in device_fingerprints(device_info, ip_address)
+        if devices.get(fingerprint, 0) < stale_before
+    ]
+    if not fingerprints:
+        return
+
+    KnownDevice.objects.bulk_create(
+        [KnownDevice(user=user, fingerprint=fingerprint, last_seen=now) for fingerprint in fingerprints],
+        update_conflicts=True,
+        unique_fields=['user', 'fingerprint'],
+        update_fields=['last_seen'],
     )
 
+    devices.update(dict.fromkeys(fingerprints, now.timestamp()))
+    cache.set(KNOWN_DEVICES_CACHE_KEY.format(user_id=user.pk), devices, KNOWN_DEVICES_CACHE_TIMEOUT)
+
 
 def send_new_login_notification(user, login_history):
     """
     Send email notification for new device/location login
     """
     try:
-        html_message = render_to_string('accounts/new_login_detected.html', {
-            'user': user,
-            'timestamp': login_history.timestamp,
-            'location': login_history.location or 'Unknown',
-            'device_type': login_history.device_type or 'Unknown',
-            'browser': login_history.browser or 'Unknown',
-            'ip_address': login_history.ip_address,
-        })
-        plain_message = strip_tags(html_message)
-
-        send_mail(
-            subject="New login to your Valunds account",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-
-        login_history.notification_sent = True
-        login_history.save(update_fields=['notification_sent'])
-
-        logger.info(f"New login notification sent to {user.email}")
+        with transaction.atomic():
+            queue_email(
+                'accounts/new_login_detected',
+                {
+                    'user': user,
+                    'timestamp': login_history.timestamp,
+                    'location': login_history.location or 'Unknown',
+                    'device_type': login_history.device_type or 'Unknown',
+                    'browser': login_history.browser or 'Unknown',
+                    'ip_address': login_history.ip_address,
+                },
+                subject="New login to your Valunds account",
+                recipient=user.email,
+            )
+
+            login_history.notification_sent = True
+            audit_log.save(login_history, update_fields=['notification_sent'])
+
+        logger.info(f"New login notification queued for {user.email}")
     except Exception as e:
         logger.error(f"Failed to send new login notification to {user.email}: {e}")
 
@@ -133,30 +226,25 @@ def send_password_change_notification(user, ip_address: str = None):
     Send email notification when password is changed
     """
     try:
-        html_message = render_to_string('accounts/password_changed.html', {
-            'user': user,
-        })
-        plain_message = strip_tags(html_message)
-
-        send_mail(
-            subject="Your Valunds password has been changed",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-
-        # Log security event
         from .models import SecurityEvent
-        SecurityEvent.objects.create(
-            user=user,
-            event_type=SecurityEvent.EventType.PASSWORD_CHANGED,
-            ip_address=ip_address,
-            notification_sent=True
-        )
 
-        logger.info(f"Password change notification sent to {user.email}")
+        with transaction.atomic():
+            queue_email(
+                'accounts/password_changed',
+                {'user': user},
+                subject="Your Valunds password has been changed",
+                recipient=user.email,
+            )
+
+            # Log security event
+            audit_log.add(SecurityEvent(
+                user=user,
+                event_type=SecurityEvent.EventType.PASSWORD_CHANGED,
+                ip_address=ip_address,
+                notification_sent=True
+            ))
+
+        logger.info(f"Password change notification queued for {user.email}")
     except Exception as e:
         logger.error(f"Failed to send password change notification to {user.email}: {e}")
 
@@ -166,41 +254,39 @@ def send_email_change_notification(user, old_email: str, new_email: str):
     Send notification to OLD email when email change is requested
     """
     try:
-        html_message = render_to_string('accounts/email_change_notification.html', {
-            'user': user,
-            'old_email': old_email,
-            'new_email': new_email,
-        })
-        plain_message = strip_tags(html_message)
-
-        # Send to OLD email address
-        send_mail(
-            subject="Email address change request for your Valunds account",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[old_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-
-        # Log security event
         from .models import SecurityEvent
-        SecurityEvent.objects.create(
-            user=user,
-            event_type=SecurityEvent.EventType.EMAIL_CHANGED,
-            details={'old_email': old_email, 'new_email': new_email},
-            notification_sent=True
-        )
 
-        logger.info(f"Email change notification sent to {old_email}")
+        with transaction.atomic():
+            # Send to OLD email address
+            queue_email(
+                'accounts/email_change_notification',
+                {'user': user, 'old_email': old_email, 'new_email': new_email},
+                subject="Email address change request for your Valunds account",
+                recipient=old_email,
+            )
+
+            # Log security event
+            audit_log.add(SecurityEvent(
+                user=user,
+                event_type=SecurityEvent.EventType.EMAIL_CHANGED,
+                details={'old_email': old_email, 'new_email': new_email},
+                notification_sent=True
+            ))
+
+        logger.info(f"Email change notification queued for {old_email}")
     except Exception as e:
         logger.error(f"Failed to send email change notification: {e}")
 
 
-def track_login_attempt(user, request, success: bool = True, flagged: bool = False):
+def track_login_attempt(user, request, success: bool = True, flagged: bool = False,
+                        update_fields: list[str] | None = None):
     """
     Track login attempt and create LoginHistory record
     Returns the LoginHistory object
+
+    On success, ``update_fields`` names extra user fields the caller has already
+    set on ``user``; they are written in the same UPDATE as the last-login info.
+    The returned object also carries a transient ``new_device`` flag.
     """
     from .models import LoginHistory
 
@@ -210,7 +296,7 @@ def track_login_attempt(user, request, success: bool = True, flagged: bool = Fal
         device_info = parse_user_agent(user_agent_string)
         location = get_location_from_ip(ip_address)
 
-        login_history = LoginHistory.objects.create(
+        login_history = audit_log.add(LoginHistory(
             user=user,
             ip_address=ip_address,
             user_agent=user_agent_string,
@@ -220,14 +306,20 @@ def track_login_attempt(user, request, success: bool = True, flagged: bool = Fal
             location=location,
             success=success,
             flagged_as_suspicious=flagged
-        )
+        ))
 
         # Update user's last login info if successful
         if success:
+            # Decide new-device status before this login is remembered
+            login_history.new_device = is_new_device(user, device_info, ip_address)
+            remember_device(user, device_info, ip_address)
+
             user.last_login_ip = ip_address
             user.last_login_user_agent = user_agent_string
             user.last_login_location = location
-            user.save(update_fields=['last_login_ip', 'last_login_user_agent', 'last_login_location'])
+            user.save(update_fields=[
+                'last_login_ip', 'last_login_user_agent', 'last_login_location', *(update_fields or [])
+            ])
 
         return login_history
     except Exception as e:
@@ -249,17 +341,21 @@ def check_and_notify_new_device(user, login_history):
             'device_type': login_history.device_type
         }
 
-        if is_new_device(user, device_info, login_history.ip_address):
+        new_device = getattr(login_history, 'new_device', None)
+        if new_device is None:
+            new_device = is_new_device(user, device_info, login_history.ip_address)
+
+        if new_device:
             # Mark as new device and send notification
             login_history.flagged_as_suspicious = False
-            login_history.save(update_fields=['flagged_as_suspicious'])
+            audit_log.save(login_history, update_fields=['flagged_as_suspicious'])
 
             # Send notification
             send_new_login_notification(user, login_history)
 
             # Log security event
             from .models import SecurityEvent
-            SecurityEvent.objects.create(
+            audit_log.add(SecurityEvent(
                 user=user,
                 event_type=SecurityEvent.EventType.NEW_DEVICE_LOGIN,
                 ip_address=login_history.ip_address,
@@ -271,6 +367,6 @@ def check_and_notify_new_device(user, login_history):
                     'location': login_history.location
                 },
                 notification_sent=True
-            )
+            ))
     except Exception as e:
         logger.error(f"Error checking for new device: {e}")
@@ -0,0 +1,55 @@
+"""
+Celery tasks for the accounts app.
+"""
+from celery import shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
+from django.conf import settings
+
+from .audit import audit_log
+from .emails import claim_due_emails, deliver_emails, preload_email_templates
+from .login_throttle import RedisLoginThrottle, get_login_throttle
+from .partitions import maintain_partitions
+
+
+@worker_process_init.connect
+def _preload_email_templates(**kwargs):
+    preload_email_templates()
+
+
+@worker_process_shutdown.connect
+def _flush_audit_log(**kwargs):
+    audit_log.flush()
+
+
+@shared_task(ignore_result=True)
+def deliver_outbound_emails(email_ids: list[str]) -> None:
+    """Deliver a batch of outbox messages as soon as their transaction has committed."""
+    deliver_emails(claim_due_emails(limit=len(email_ids), ids=email_ids))
+
+
+@shared_task(ignore_result=True)
+def drain_email_outbox(batch_size: int = 100) -> int:
+    """Deliver every due outbox message, including scheduled retries."""
+    sent = 0
+    while emails := claim_due_emails(limit=batch_size):
+        sent += deliver_emails(emails)
+        if len(emails) < batch_size:
+            break
+    return sent
+
+
+@shared_task(ignore_result=True)
+def maintain_audit_partitions() -> None:
+    """Keep future audit partitions ready and drop those past retention."""
+    maintain_partitions(
+        months_ahead=settings.AUDIT_PARTITIONS_AHEAD,
+        retention_months=settings.AUDIT_RETENTION_MONTHS,
+    )
+
+
+@shared_task(ignore_result=True)
+def sync_login_state(user_id: str) -> None:
+    """Mirror Redis-held failed-login state onto the users row for the admin."""
+    throttle = get_login_throttle()
+    if isinstance(throttle, RedisLoginThrottle):
+        throttle.sync_user_columns(user_id)
@@ -0,0 +1,37 @@
+import pytest
+from rest_framework.test import APIClient
+
+from backend.apps.accounts import login_throttle
+from backend.apps.accounts.audit import audit_log
+from backend.apps.accounts.user_cache import user_cache
+
+
+@pytest.fixture(autouse=True)
+def local_services(settings, monkeypatch):
+    """Run against in-process stand-ins for Redis: locmem cache, database lockout, synchronous audit writes."""
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    settings.RATELIMIT_ENABLE = False
+    settings.SECURE_SSL_REDIRECT = False
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    settings.LOGIN_THROTTLE_BACKEND = "database"
+
+    monkeypatch.setattr(login_throttle, "_throttle", None)
+    monkeypatch.setattr(audit_log, "enabled", False)
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username="ada",
+        email="ada@example.com",
+        password="correct horse battery",
+        email_verified=True,
+    )
@@ -0,0 +1,52 @@
+import pytest
+from django.db import transaction
+
+from backend.apps.accounts.audit import AuditBuffer
+from backend.apps.accounts.models import LoginHistory, SecurityEvent
+
+pytestmark = pytest.mark.django_db
+
+
+def event(user) -> SecurityEvent:
+    return SecurityEvent(user=user, event_type=SecurityEvent.EventType.PASSWORD_CHANGED)
+
+
+@pytest.fixture
+def buffer():
+    buffer = AuditBuffer(enabled=True, max_size=2, flush_interval=60)
+    yield buffer
+    buffer.flush()
+
+
+def test_full_buffer_in_a_transaction_is_flushed_after_commit(buffer, user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        buffer.add(event(user))
+        buffer.add(event(user))
+        assert not SecurityEvent.objects.exists()
+
+    assert SecurityEvent.objects.count() == 2
+
+
+def test_events_are_dropped_with_their_transaction(buffer, user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        buffer.add(event(user))  # another request's event
+
+        with pytest.raises(RuntimeError), transaction.atomic():
+            buffer.add(event(user))
+            raise RuntimeError
+
+    assert not SecurityEvent.objects.exists()
+    assert buffer.flush() == 1
+
+
+def test_changes_before_the_write_are_saved_with_the_event(buffer, user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        login = buffer.add(LoginHistory(user=user, ip_address="203.0.113.7", user_agent="Mozilla/5.0"))
+        login.flagged_as_suspicious = True
+        buffer.save(login, update_fields=["flagged_as_suspicious"])
+
+    buffer.flush()
+    login.notification_sent = True
+    buffer.save(login, update_fields=["notification_sent"])
+
+    assert LoginHistory.objects.filter(flagged_as_suspicious=True, notification_sent=True).count() == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from backend.apps.accounts.geoip import GeoIPDatabase, build_database
+
+RANGES = """start_ip,end_ip,country,city
+81.2.69.0,81.2.69.255,United Kingdom,London
+16777216,16777471,Australia,Brisbane
+2001:db8::,2001:db8::ffff,Sweden,Stockholm
+81.2.70.0,81.2.70.127,United Kingdom,London
+10.0.0.0,2001:db8::1,Nowhere,
+"""
+
+
+@pytest.fixture
+def database(tmp_path) -> GeoIPDatabase:
+    csv_path = tmp_path / "ranges.csv"
+    csv_path.write_text(RANGES)
+
+    assert build_database(csv_path, tmp_path / "geoip.bin") == (3, 1)
+    return GeoIPDatabase(tmp_path / "geoip.bin")
+
+
+def test_round_trip(database):
+    assert (database.ipv4_count, database.ipv6_count, database.location_count) == (3, 1, 3)
+    assert database.lookup("81.2.69.160") == "London, United Kingdom"
+    assert database.lookup("81.2.70.1") == "London, United Kingdom"
+    assert database.lookup("1.0.0.1") == "Brisbane, Australia"
+    assert database.lookup("2001:db8::42") == "Stockholm, Sweden"
+
+
+def test_ipv4_mapped_ipv6_uses_the_ipv4_table(database):
+    assert database.lookup("::ffff:81.2.69.160") == "London, United Kingdom"
+
+
+@pytest.mark.parametrize("address, location", [
+    ("81.2.69.0", "London, United Kingdom"),
+    ("81.2.69.255", "London, United Kingdom"),
+    ("81.2.68.255", ""),
+    ("81.2.70.128", ""),
+    ("0.0.0.0", ""),
+    ("255.255.255.255", ""),
+    ("2001:db8::", "Stockholm, Sweden"),
+    ("2001:db8::ffff", "Stockholm, Sweden"),
+    ("2001:db7:ffff:ffff:ffff:ffff:ffff:ffff", ""),
+    ("2001:db8::1:0", ""),
+    ("not an address", ""),
+])
+def test_lookup_at_the_range_edges(database, address, location):
+    assert database.lookup(address) == location
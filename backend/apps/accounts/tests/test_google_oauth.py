@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache
+from django.urls import reverse
+from jwt.algorithms import RSAAlgorithm
+
+from backend.apps.accounts import google_oauth
+from backend.apps.accounts.google_oauth import (
+    GoogleAuthError,
+    GoogleKeySet,
+    verify_id_token,
+)
+from backend.apps.accounts.models import User
+
+CLIENT_ID = "valunds-test.apps.googleusercontent.com"
+
+
+class SigningKey:
+    def __init__(self, kid: str):
+        self.kid = kid
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    @property
+    def jwk(self) -> dict:
+        return {**json.loads(RSAAlgorithm.to_jwk(self.private_key.public_key())), "kid": self.kid, "use": "sig"}
+
+    def sign(self, **overrides) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": CLIENT_ID,
+            "sub": "110169484474386276334",
+            "email": "ada@example.com",
+            "email_verified": True,
+            "given_name": "Ada",
+            "family_name": "Lovelace",
+            "iat": now,
+            "exp": now + 3600,
+            **overrides,
+        }
+        return jwt.encode(claims, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+
+
+class GoogleStandIn(ThreadingHTTPServer):
+    """Serves a JWKS document and a token endpoint that returns ``id_token``."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), GoogleStandInHandler)
+        self.keys: list[SigningKey] = []
+        self.id_token = ""
+        self.jwks_fetches = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class GoogleStandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):  # noqa: N802
+        self.server.jwks_fetches += 1
+        self._send({"keys": [key.jwk for key in self.server.keys]}, {"Cache-Control": "public, max-age=3600"})
+
+    def do_POST(self):  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send({"access_token": "ya29.test", "id_token": self.server.id_token, "token_type": "Bearer"})
+
+    def _send(self, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def google(monkeypatch):
+    server = GoogleStandIn()
+    server.keys.append(SigningKey("key-1"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Key sets share the fetched JWKS through the cache; start without one
+    cache.delete(google_oauth.JWKS_CACHE_KEY)
+    monkeypatch.setattr(google_oauth, "google_keys", GoogleKeySet(f"{server.url}/certs"))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_valid_token_is_verified_with_one_key_fetch(google):
+    for _ in range(2):
+        claims = verify_id_token(google.keys[0].sign(), CLIENT_ID)
+
+    assert claims["email"] == "ada@example.com"
+    assert google.jwks_fetches == 1
+
+
+def test_unknown_key_id_triggers_a_refetch(google, monkeypatch):
+    monkeypatch.setattr(google_oauth, "JWKS_REFRESH_COOLDOWN", 0)
+    verify_id_token(google.keys[0].sign(), CLIENT_ID)
+
+    # Google rotates keys while ours are still fresh
+    google.keys = [SigningKey("key-2")]
+    claims = verify_id_token(google.keys[0].sign(), CLIENT_ID)
+
+    assert claims["sub"] == "110169484474386276334"
+    assert google.jwks_fetches == 2
+
+
+def test_unknown_key_id_within_the_cooldown_is_refused_without_a_refetch(google):
+    verify_id_token(google.keys[0].sign(), CLIENT_ID)
+
+    with pytest.raises(GoogleAuthError, match="Unknown signing key"):
+        verify_id_token(SigningKey("key-forged").sign(), CLIENT_ID)
+    assert google.jwks_fetches == 1
+
+
+def test_signature_from_another_key_is_refused(google):
+    forged = SigningKey("key-1").sign()
+
+    with pytest.raises(GoogleAuthError, match="Invalid id_token"):
+        verify_id_token(forged, CLIENT_ID)
+
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "someone-else.apps.googleusercontent.com"},
+    {"iss": "https://evil.example.com"},
+    {"iat": int(time.time()) - 7200, "exp": int(time.time()) - 3600},
+], ids=["wrong-audience", "wrong-issuer", "expired"])
+def test_token_with_bad_claims_is_refused(google, claims):
+    with pytest.raises(GoogleAuthError):
+        verify_id_token(google.keys[0].sign(**claims), CLIENT_ID)
+
+
+@pytest.fixture
+def google_login(google, settings):
+    settings.GOOGLE_TOKEN_URL = f"{google.url}/token"
+    settings.SOCIALACCOUNT_PROVIDERS = {"google": {"APP": {"client_id": CLIENT_ID, "secret": "test-secret"}}}
+    return google
+
+
+@pytest.mark.django_db
+def test_callback_refuses_unverified_email(client, google_login):
+    google_login.id_token = google_login.keys[0].sign(email_verified=False)
+
+    response = client.get(reverse("accounts:google-callback"), {"code": "4/0Ab-test"})
+
+    assert response.status_code == 302
+    assert response["Location"].endswith("/login?error=email_not_verified")
+    assert not User.objects.filter(email="ada@example.com").exists()
+
+
+@pytest.mark.django_db
+def test_callback_signs_in_with_a_verified_token(client, google_login):
+    google_login.id_token = google_login.keys[0].sign()
+
+    response = client.get(reverse("accounts:google-callback"), {"code": "4/0Ab-test"})
+
+    assert response.status_code == 302
+    assert response["Location"].endswith("/oauth/callback")
+    assert "refresh_token" in response.cookies
+    assert User.objects.get(email="ada@example.com").email_verified
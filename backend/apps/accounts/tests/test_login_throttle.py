@@ -0,0 +1,118 @@
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from backend.apps.accounts import login_throttle
+from backend.apps.accounts.login_throttle import (
+    FAILED_LOGIN_WINDOW,
+    LOCKOUT_DURATION,
+    MAX_FAILED_LOGINS,
+    RedisLoginThrottle,
+)
+from backend.apps.accounts.models import User
+
+
+def redis_client():
+    """The Redis at REDIS_URL if one answers, else fakeredis with Lua support, else skip."""
+    client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5)
+    try:
+        client.ping()
+        return client
+    except redis.ConnectionError:
+        pass
+    fakeredis = pytest.importorskip("fakeredis", reason="needs Redis or fakeredis")
+    # fakeredis runs Lua scripts through lupa
+    pytest.importorskip("lupa", reason="needs Redis or fakeredis with lupa")
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def user():
+    # Only the primary key is used; the keys are unique to each test
+    return User(pk=uuid.uuid4())
+
+
+@pytest.fixture
+def throttle(user, monkeypatch):
+    client = redis_client()
+    monkeypatch.setattr(login_throttle, "schedule_state_sync", lambda user_id, immediate=False: None)
+    yield RedisLoginThrottle(client)
+    client.delete(*RedisLoginThrottle._keys(user.pk))
+
+
+def fail(throttle, user, times: int, now):
+    return [throttle.record_failure(user, now) for _ in range(times)]
+
+
+def test_failures_below_the_threshold_are_counted_without_a_lock(throttle, user):
+    now = timezone.now()
+
+    (state, newly_locked), = fail(throttle, user, 1, now)
+
+    assert state.failures == 1
+    assert not newly_locked
+    assert state.locked_until is None
+    status = throttle.status(user, now)
+    assert status.failures == 1
+    assert abs(status.last_failure - now) < timedelta(milliseconds=1)
+
+
+def test_only_the_attempt_reaching_the_threshold_sets_the_lock(throttle, user):
+    now = timezone.now()
+
+    results = fail(throttle, user, MAX_FAILED_LOGINS + 1, now)
+
+    assert [newly_locked for _, newly_locked in results] == [False] * (MAX_FAILED_LOGINS - 1) + [True, False]
+    state = throttle.status(user, now)
+    assert state.failures == MAX_FAILED_LOGINS
+    assert now + LOCKOUT_DURATION - timedelta(seconds=5) < state.locked_until <= now + LOCKOUT_DURATION
+
+
+def test_failures_older_than_the_window_are_not_counted(throttle, user):
+    now = timezone.now()
+    fail(throttle, user, MAX_FAILED_LOGINS - 1, now - FAILED_LOGIN_WINDOW - timedelta(seconds=1))
+
+    assert throttle.status(user, now).failures == 0
+    (state, newly_locked), = fail(throttle, user, 1, now)
+    assert state.failures == 1
+    assert not newly_locked
+
+
+def test_failures_while_locked_report_only_the_window(throttle, user):
+    now = timezone.now()
+    fail(throttle, user, MAX_FAILED_LOGINS - 1, now - FAILED_LOGIN_WINDOW + timedelta(seconds=1))
+    (state, newly_locked), = fail(throttle, user, 1, now)
+    assert newly_locked
+
+    # The first four have left the window; the lock still holds
+    (state, newly_locked), = fail(throttle, user, 1, now + timedelta(seconds=2))
+
+    assert state.failures == 1
+    assert state.locked_until is not None
+    assert not newly_locked
+
+
+def test_lock_expires_by_itself(throttle, user, monkeypatch):
+    monkeypatch.setattr(login_throttle, "LOCKOUT_DURATION", timedelta(milliseconds=200))
+    now = timezone.now()
+    fail(throttle, user, MAX_FAILED_LOGINS, now)
+    assert throttle.status(user, now).locked_until is not None
+
+    time.sleep(0.3)
+
+    assert throttle.status(user, now).locked_until is None
+
+
+def test_reset_clears_failures_and_lock(throttle, user):
+    now = timezone.now()
+    fail(throttle, user, MAX_FAILED_LOGINS, now)
+
+    assert throttle.reset(user) == []
+
+    state = throttle.status(user, now)
+    assert state == (0, None, None)
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.apps.accounts.login_throttle import MAX_FAILED_LOGINS
+from backend.apps.accounts.views import complete_login
+
+pytestmark = pytest.mark.django_db
+
+LOGIN_URL = reverse("accounts:login")
+BROWSER = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+
+
+def login(api_client, email, password):
+    return api_client.post(LOGIN_URL, {"email": email, "password": password}, format="json", HTTP_USER_AGENT=BROWSER)
+
+
+def test_unknown_user_costs_one_query(api_client, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        response = login(api_client, "nobody@example.com", "whatever it is")
+
+    assert response.status_code == 401
+
+
+def test_bad_password_counts_the_failure_in_one_update(api_client, user, django_assert_num_queries):
+    # User lookup, audit row, conditional UPDATE and its read-back, in a savepoint
+    with django_assert_num_queries(6):
+        response = login(api_client, user.email, "wrong password")
+
+    assert response.status_code == 401
+    user.refresh_from_db()
+    assert user.failed_login_attempts == 1
+
+
+def test_locked_account_is_refused_after_the_lookup(api_client, user, django_assert_num_queries):
+    user.failed_login_attempts = 1
+    user.account_locked_until = timezone.now() + timedelta(minutes=10)
+    user.save()
+
+    with django_assert_num_queries(1):
+        response = login(api_client, user.email, "correct horse battery")
+
+    assert response.status_code == 403
+    assert response.json()["code"] == "account_locked"
+
+
+def test_login_from_known_device(api_client, user, django_assert_num_queries):
+    assert login(api_client, user.email, "correct horse battery").status_code == 200
+
+    # User lookup, audit row, last-login UPDATE and the refresh token's outstanding row
+    with django_assert_num_queries(4):
+        response = login(api_client, user.email, "correct horse battery")
+
+    assert response.status_code == 200
+    assert set(response.json()["tokens"]) == {"access", "refresh"}
+
+
+def test_expired_lock_resets_the_counter(api_client, user):
+    user.failed_login_attempts = MAX_FAILED_LOGINS
+    user.last_failed_login = timezone.now() - timedelta(minutes=16)
+    user.account_locked_until = timezone.now() - timedelta(minutes=1)
+    user.save()
+
+    # No reCAPTCHA token: only accepted because the counter was reset with the lock
+    response = login(api_client, user.email, "correct horse battery")
+
+    assert response.status_code == 200
+    user.refresh_from_db()
+    assert user.failed_login_attempts == 0
+    assert user.account_locked_until is None
+
+
+def test_unverified_email_is_refused_after_the_lookup(api_client, user, django_assert_num_queries):
+    user.email_verified = False
+    # Below the reCAPTCHA threshold
+    user.failed_login_attempts = 1
+    user.save()
+
+    with django_assert_num_queries(1):
+        response = login(api_client, user.email, "correct horse battery")
+
+    assert response.status_code == 403
+    assert response.json()["code"] == "email_not_verified"
+    assert "tokens" not in response.json()
+    assert "refresh_token" not in response.cookies
+    user.refresh_from_db()
+    assert user.failed_login_attempts == 1
+
+
+def test_complete_login_records_the_login_and_issues_tokens(user, rf):
+    # The shared success path of the BankID and Google callbacks
+    request = rf.get("/", HTTP_USER_AGENT=BROWSER, REMOTE_ADDR="203.0.113.7")
+
+    tokens = complete_login(user, request)
+
+    assert AccessToken(tokens["access"])[api_settings.USER_ID_CLAIM] == str(user.pk)
+    history = user.login_history.get()
+    assert history.success
+    assert history.ip_address == "203.0.113.7"
+    assert history.browser.startswith("Chrome")
+    user.refresh_from_db()
+    assert user.last_login_ip == "203.0.113.7"
+    assert user.last_login_user_agent == BROWSER
@@ -0,0 +1,108 @@
+import socket
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+from django.core.mail import EmailMessage, get_connection
+
+from backend.apps.accounts import mail_backends
+
+POOLED_BACKEND = "backend.apps.accounts.mail_backends.PooledSMTPEmailBackend"
+
+
+class RecordingHandler:
+    """Keeps the client address of every delivered message, one address per SMTP session."""
+
+    def __init__(self):
+        self.peers = []
+
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        self.peers.append(session.peer)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_smtp_server(settings) -> tuple[Controller, RecordingHandler]:
+    """Local SMTP stand-in that drops sessions idle for more than half a second."""
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port(), timeout=0.5)
+    controller.start()
+
+    settings.EMAIL_HOST = controller.hostname
+    settings.EMAIL_PORT = controller.port
+    settings.EMAIL_USE_SSL = False
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_HOST_USER = ""
+    settings.EMAIL_HOST_PASSWORD = ""
+    settings.EMAIL_POOL_MAX_IDLE = 60
+    return controller, handler
+
+
+@pytest.fixture(autouse=True)
+def empty_pool():
+    yield
+    mail_backends._pool.close_all()
+
+
+@pytest.fixture
+def smtp_server(settings):
+    controller, handler = start_smtp_server(settings)
+    yield handler
+    controller.stop()
+
+
+def send(backend=POOLED_BACKEND, **kwargs) -> int:
+    connection = get_connection(backend, **kwargs)
+    message = EmailMessage("Subject", "Body", "kontakt@valunds.se", ["ada@example.com"], connection=connection)
+    return message.send()
+
+
+def test_sessions_are_reused_across_sends(smtp_server):
+    for _ in range(3):
+        assert send() == 1
+
+    assert len(smtp_server.peers) == 3
+    assert len(set(smtp_server.peers)) == 1
+
+
+def test_stock_backend_opens_a_session_per_send(smtp_server):
+    for _ in range(3):
+        send("django.core.mail.backends.smtp.EmailBackend")
+
+    assert len(set(smtp_server.peers)) == 3
+
+
+def test_sessions_idle_too_long_are_not_reused(smtp_server, settings):
+    settings.EMAIL_POOL_MAX_IDLE = 0.1
+
+    send()
+    time.sleep(0.2)
+    send()
+
+    assert len(set(smtp_server.peers)) == 2
+
+
+@pytest.mark.parametrize("fail_silently", [False, True])
+def test_session_closed_by_server_is_replaced_once(smtp_server, fail_silently):
+    send()
+    # Longer than the server's idle timeout, shorter than EMAIL_POOL_MAX_IDLE
+    time.sleep(1)
+
+    assert send(fail_silently=fail_silently) == 1
+    assert len(set(smtp_server.peers)) == 2
+
+
+def test_failed_reconnect_honours_fail_silently(settings):
+    controller, _ = start_smtp_server(settings)
+    send()
+    controller.stop()
+
+    assert send(fail_silently=True) == 0
+
+    with pytest.raises(OSError):
+        send()
@@ -0,0 +1,52 @@
+from datetime import UTC, datetime
+
+import pytest
+from django.db import connection
+
+from backend.apps.accounts.models import LoginHistory
+from backend.apps.accounts.partitions import (
+    create_partitions,
+    list_partitions,
+    month_start,
+)
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(connection.vendor != "postgresql", reason="audit tables are only partitioned on PostgreSQL"),
+]
+
+
+def partition_of(row) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT tableoid::regclass::text FROM login_history WHERE id = %s", [row.pk])
+        return cursor.fetchone()[0]
+
+
+def test_rows_past_the_last_partition_go_to_the_default_partition(user):
+    last_month = list_partitions("login_history")[-1][1]
+    month = month_start(last_month, 2)
+    row = LoginHistory.objects.create(
+        user=user, ip_address="203.0.113.7", timestamp=datetime(month.year, month.month, 15, tzinfo=UTC)
+    )
+
+    assert partition_of(row) == "login_history_default"
+
+
+def test_creating_a_partition_moves_its_rows_out_of_the_default_partition(user):
+    last_month = list_partitions("login_history")[-1][1]
+    month = month_start(last_month, 2)
+    row = LoginHistory.objects.create(
+        user=user, ip_address="203.0.113.7", timestamp=datetime(month.year, month.month, 15, tzinfo=UTC)
+    )
+
+    created = create_partitions("login_history", month, month)
+
+    assert created == [f"login_history_p{month:%Y_%m}"]
+    assert partition_of(row) == created[0]
+    assert LoginHistory.objects.filter(pk=row.pk).exists()
+
+
+def test_primary_key_keeps_its_conventional_name():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = 'login_history'::regclass AND contype = 'p'")
+        assert cursor.fetchone()[0] == "login_history_pkey"
@@ -0,0 +1,164 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from backend.apps.accounts.models import (
+    KnownDevice,
+    LoginHistory,
+    OutboundEmail,
+    SecurityEvent,
+    User,
+)
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(connection.vendor != "postgresql", reason="query plans are checked on PostgreSQL"),
+]
+
+USERS = 2000
+SEEDED_TABLES = ["users", "login_history", "security_events", "known_devices", "email_outbox"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded(django_db_setup, django_db_blocker):
+    """Committed rows in the shape production has, with fresh planner statistics."""
+    with django_db_blocker.unblock():
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            User(
+                username=f"user{n}",
+                email=f"user{n}@example.com",
+                password="!",
+                account_locked_until=now + timedelta(minutes=15) if n % 400 == 0 else None,
+            )
+            for n in range(USERS)
+        )
+        LoginHistory.objects.bulk_create(
+            LoginHistory(
+                user=user,
+                timestamp=now - timedelta(hours=n * 37 % 480),
+                ip_address="203.0.113.7",
+                user_agent="Mozilla/5.0",
+                success=n % 4 != 0,
+                flagged_as_suspicious=n % 500 == 0,
+            )
+            for user in users
+            for n in range(10)
+        )
+        SecurityEvent.objects.bulk_create(
+            SecurityEvent(user=user, event_type=SecurityEvent.EventType.NEW_DEVICE_LOGIN, timestamp=now - timedelta(days=n))
+            for user in users
+            for n in range(3)
+        )
+        KnownDevice.objects.bulk_create(
+            KnownDevice(user=user, fingerprint=f"{user.pk.hex}{n}") for user in users for n in range(3)
+        )
+        OutboundEmail.objects.bulk_create(
+            OutboundEmail(
+                recipient="ada@example.com",
+                subject="Hello",
+                body="Hello",
+                status=OutboundEmail.Status.PENDING if n % 250 == 0 else OutboundEmail.Status.SENT,
+                next_attempt_at=now - timedelta(minutes=n % 60),
+            )
+            for n in range(5000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {', '.join(SEEDED_TABLES)}")
+
+        yield users
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(SEEDED_TABLES)} CASCADE")
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def index_and_partitions(name: str) -> set[str]:
+    """An index plus the per-partition indexes attached to it."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass", [name])
+        return {name, *(row[0] for row in cursor.fetchall())}
+
+
+def index_on(model, *fields: str) -> str:
+    return next(index.name for index in model._meta.indexes if tuple(index.fields) == fields)
+
+
+def assert_plan(queryset, uses: str | None = None):
+    """Fail on a sequential scan of a non-empty table, or if ``uses`` isn't one of the indexes read."""
+    nodes = list(plan_nodes(json.loads(queryset.explain(format="json"))[0]["Plan"]))
+    plan = queryset.explain()
+
+    seq_scanned = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+    if seq_scanned:
+        with connection.cursor() as cursor:
+            # Empty partitions are cheapest to scan sequentially; only populated ones count
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND reltuples > 0", [seq_scanned]
+            )
+            populated = [row[0] for row in cursor.fetchall()]
+        assert not populated, f"Sequential scan of {populated}:\n{plan}"
+
+    if uses is not None:
+        indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+        assert indexes & index_and_partitions(uses), f"Expected {uses}:\n{plan}"
+
+
+def test_login_lookup_by_email():
+    assert_plan(User.objects.filter(email="user1234@example.com"))
+
+
+def test_locked_accounts():
+    assert_plan(User.objects.filter(account_locked_until__isnull=False), uses="users_locked_until_idx")
+
+
+def test_recent_logins_of_a_user(seeded):
+    assert_plan(
+        LoginHistory.objects.filter(user=seeded[42])[:20],
+        uses=index_on(LoginHistory, "user", "-timestamp"),
+    )
+
+
+def test_successful_and_failed_login_counts_of_a_user(seeded):
+    since = timezone.now() - timedelta(days=30)
+    for success in (True, False):
+        assert_plan(
+            seeded[42].login_history.filter(success=success, timestamp__gte=since).values("pk"),
+            uses="login_history_user_success_idx",
+        )
+
+
+def test_flagged_logins():
+    assert_plan(LoginHistory.objects.filter(flagged_as_suspicious=True)[:50], uses="login_history_flagged_idx")
+
+
+def test_recent_security_events_of_a_user(seeded):
+    since = timezone.now() - timedelta(days=30)
+    assert_plan(
+        seeded[42].security_events.filter(timestamp__gte=since),
+        uses=index_on(SecurityEvent, "user", "-timestamp"),
+    )
+
+
+def test_known_devices_of_a_user(seeded):
+    since = timezone.now() - timedelta(days=90)
+    assert_plan(
+        KnownDevice.objects.filter(user=seeded[42], last_seen__gte=since).values_list("fingerprint", "last_seen"),
+        uses="known_devices_user_fingerprint_uniq",
+    )
+
+
+def test_outbox_drain():
+    assert_plan(
+        OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=timezone.now())
+        .order_by("next_attempt_at")[:50],
+        uses="email_outbox_pending_idx",
+    )
@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+
+from backend.apps.accounts import recaptcha
+from backend.apps.accounts.recaptcha import verify_recaptcha
+
+
+class SiteverifyStandIn:
+    """Answers like Google: a token verifies once, then it is a duplicate."""
+
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data, timeout):
+        self.posts.append(data)
+        if sum(post["response"] == data["response"] for post in self.posts) > 1:
+            return Response({"success": False, "error-codes": ["timeout-or-duplicate"]})
+        return Response({"success": True, "action": "login", "score": 0.9})
+
+
+class Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def siteverify(monkeypatch):
+    stand_in = SiteverifyStandIn()
+    # Verdicts are memoized in the cache; start without any
+    cache.clear()
+    monkeypatch.setattr(recaptcha, "get_session", lambda: stand_in)
+    return stand_in
+
+
+def test_double_submit_reuses_the_verdict(siteverify):
+    for _ in range(2):
+        assert verify_recaptcha("token", "login", "203.0.113.7", "ada@example.com") == (True, 0.9)
+
+    assert len(siteverify.posts) == 1
+    assert siteverify.posts[0]["remoteip"] == "203.0.113.7"
+
+
+@pytest.mark.parametrize("remote_ip, email", [
+    ("198.51.100.9", "ada@example.com"),
+    ("203.0.113.7", "grace@example.com"),
+], ids=["other-client", "other-account"])
+def test_replayed_token_is_verified_again(siteverify, remote_ip, email):
+    verify_recaptcha("token", "login", "203.0.113.7", "ada@example.com")
+
+    assert verify_recaptcha("token", "login", remote_ip, email) == (False, 0.0)
+    assert len(siteverify.posts) == 2
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from backend.apps.accounts import tokens
+from backend.apps.accounts.tokens import (
+    EMAIL_VERIFICATION,
+    PASSWORD_RESET,
+    InvalidTokenError,
+    check_token,
+    make_token,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def unverified(user):
+    user.email_verified = False
+    user.save(update_fields=["email_verified"])
+    return user
+
+
+def test_verification_token_checks_out(unverified):
+    assert check_token(make_token(unverified, EMAIL_VERIFICATION), EMAIL_VERIFICATION) == unverified
+
+
+def test_resend_supersedes_the_earlier_link(unverified, monkeypatch):
+    first = make_token(unverified, EMAIL_VERIFICATION)
+    later = timezone.now() + timedelta(minutes=1)
+    monkeypatch.setattr(tokens.timezone, "now", lambda: later)
+
+    second = make_token(unverified, EMAIL_VERIFICATION)
+
+    with pytest.raises(InvalidTokenError):
+        check_token(first, EMAIL_VERIFICATION)
+    assert check_token(second, EMAIL_VERIFICATION) == unverified
+
+
+def test_verification_token_is_single_use(unverified):
+    token = make_token(unverified, EMAIL_VERIFICATION)
+    unverified.email_verified = True
+    unverified.save(update_fields=["email_verified"])
+
+    with pytest.raises(InvalidTokenError):
+        check_token(token, EMAIL_VERIFICATION)
+
+
+def test_tokens_are_bound_to_their_purpose(unverified):
+    with pytest.raises(InvalidTokenError):
+        check_token(make_token(unverified, PASSWORD_RESET), EMAIL_VERIFICATION)
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.apps.accounts.login_throttle import MAX_FAILED_LOGINS, get_login_throttle
+from backend.apps.accounts.models import User
+from backend.apps.accounts.user_cache import user_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def signed_in(api_client, user):
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    # Caches the user's snapshot
+    assert api_client.get(reverse("accounts:me")).status_code == 200
+    return api_client
+
+
+def test_lock_set_after_the_snapshot_was_cached_survives_a_password_change(signed_in, user):
+    locked_until = timezone.now() + timedelta(minutes=15)
+    User.objects.filter(pk=user.pk).update(failed_login_attempts=MAX_FAILED_LOGINS, account_locked_until=locked_until)
+
+    response = signed_in.post(
+        reverse("accounts:change-password"),
+        {"current_password": "correct horse battery", "new_password": "Different horse battery!"},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    user.refresh_from_db()
+    assert user.check_password("Different horse battery!")
+    assert user.failed_login_attempts == MAX_FAILED_LOGINS
+    assert user.account_locked_until == locked_until
+
+
+def test_failed_logins_retire_the_cached_snapshot(signed_in, user, django_capture_on_commit_callbacks):
+    throttle = get_login_throttle()
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(MAX_FAILED_LOGINS):
+            throttle.record_failure(User.objects.get(pk=user.pk), timezone.now())
+
+    cached = user_cache.get(user.pk)
+    assert cached.failed_login_attempts == MAX_FAILED_LOGINS
+    assert cached.account_locked_until is not None
@@ -0,0 +1,85 @@
+"""
+Two-level cache for parsed user-agent strings.
+
+``user_agents.parse`` runs a large regex set, but login traffic comes from a
+few hundred distinct browsers. Parsed results are kept in a bounded
+in-process LRU, backed by the shared Django cache (Redis in production) so a
+freshly started worker doesn't have to re-parse everything.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import user_agent_cache_evictions, user_agent_cache_requests
+
+SHARED_KEY_PREFIX = "ua:v1:"
+SHARED_TIMEOUT = 24 * 60 * 60
+
+
+def normalize_user_agent(user_agent_string: str) -> str:
+    """Canonical cache key: collapsed whitespace, truncated like LoginHistory.user_agent."""
+    return " ".join(user_agent_string.split())[:512]
+
+
+class UserAgentCache:
+    """Bounded LRU of parsed user agents with an optional shared-cache tier."""
+
+    def __init__(self, maxsize: int, shared: bool):
+        self.maxsize = maxsize
+        self.shared = shared
+        self._entries: OrderedDict[str, dict[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict[str, str] | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                user_agent_cache_requests.labels(result="local_hit").inc()
+                return value
+
+        if self.shared:
+            value = cache.get(self._shared_key(key))
+            if value is not None:
+                self._store_local(key, value)
+                user_agent_cache_requests.labels(result="shared_hit").inc()
+                return value
+
+        user_agent_cache_requests.labels(result="miss").inc()
+        return None
+
+    def set(self, key: str, value: dict[str, str]) -> None:
+        self._store_local(key, value)
+        if self.shared:
+            cache.set(self._shared_key(key), value, SHARED_TIMEOUT)
+
+    def set_many(self, items: dict[str, dict[str, str]]) -> None:
+        for key, value in items.items():
+            self._store_local(key, value)
+        if self.shared:
+            cache.set_many({self._shared_key(key): value for key, value in items.items()}, SHARED_TIMEOUT)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _store_local(self, key: str, value: dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                user_agent_cache_evictions.inc()
+
+    @staticmethod
+    def _shared_key(key: str) -> str:
+        return SHARED_KEY_PREFIX + hashlib.sha1(key.encode(), usedforsecurity=False).hexdigest()
+
+
+user_agent_cache = UserAgentCache(
+    maxsize=getattr(settings, "USER_AGENT_CACHE_SIZE", 1024),
+    shared=getattr(settings, "USER_AGENT_CACHE_SHARED", True),
+)
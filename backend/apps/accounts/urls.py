@@ -4,6 +4,8 @@ from .bankid_views import (
     BankIDCancelView,
     BankIDCollectView,
     BankIDInitiateView,
+    bankid_qr_frames,
+    bankid_status,
 )
 from .oauth_views import GoogleLoginCallbackView, GoogleLoginInitiateView
 from .views import (
@@ -45,4 +47,6 @@ urlpatterns = [
     path('bankid/initiate/', BankIDInitiateView.as_view(), name='bankid-initiate'),
     path('bankid/collect/', BankIDCollectView.as_view(), name='bankid-collect'),
     path('bankid/cancel/', BankIDCancelView.as_view(), name='bankid-cancel'),
+    path('bankid/status/', bankid_status, name='bankid-status'),
+    path('bankid/qr/', bankid_qr_frames, name='bankid-qr'),
 ]
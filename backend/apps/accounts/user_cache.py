@@ -0,0 +1,116 @@
+"""
+Versioned two-level cache of users for request authentication.
+
+Each user has a version number in the shared cache (Redis in production)
+that is bumped after every committed save or delete of their row, which
+covers password changes, deactivation and profile updates. A snapshot of
+the user's columns is cached under ``(id, version)`` in a bounded
+in-process LRU and in the shared cache, so authenticating a request costs
+one cache read for the version and no database query; once the version
+moves on, old snapshots are simply never looked up again.
+
+Versions are the time of the user's last change in nanoseconds (at least
+one more than the previous version), so they double as the profile's
+Last-Modified time, and a version key that was evicted is re-created from
+the clock rather than from zero and can't bring an old snapshot back.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .metrics import user_cache_requests
+from .models import User
+
+VERSION_KEY = "user:version:{user_id}"
+SNAPSHOT_KEY = "user:v1:{user_id}:{version}"
+SNAPSHOT_TIMEOUT = 60 * 60
+
+_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+
+class UserCache:
+    """Users by (id, version), in process and in the shared cache."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, int], tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> User | None:
+        """Return a fresh instance of the user, or None if they don't exist."""
+        user_id = str(user_id)
+        version = self.version(user_id)
+        key = (user_id, version)
+
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+        if values is not None:
+            user_cache_requests.labels(result="local_hit").inc()
+            return self._build(values, version)
+
+        values = cache.get(SNAPSHOT_KEY.format(user_id=user_id, version=version))
+        if values is not None:
+            user_cache_requests.labels(result="shared_hit").inc()
+        else:
+            user_cache_requests.labels(result="miss").inc()
+            # Always from the primary, so a lagging replica can't be cached under the new version
+            row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list(*_FIELDS).first()
+            if row is None:
+                return None
+            values = tuple(row)
+            cache.set(SNAPSHOT_KEY.format(user_id=user_id, version=version), values, SNAPSHOT_TIMEOUT)
+
+        self._store_local(key, values)
+        return self._build(values, version)
+
+    def version(self, user_id) -> int:
+        key = VERSION_KEY.format(user_id=str(user_id))
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    def bump(self, user_id) -> int:
+        """Move the user to a new version and return it."""
+        key = VERSION_KEY.format(user_id=str(user_id))
+        # Not atomic, but concurrent bumps each write a value newer than any a reader has seen
+        version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+        cache.set(key, version, None)
+        return version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _store_local(self, key: tuple[str, int], values: tuple) -> None:
+        with self._lock:
+            self._entries[key] = values
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _build(values: tuple, version: int) -> User:
+        # A new instance per request, so views can modify and save it
+        user = User.from_db(DEFAULT_DB_ALIAS, _FIELDS, values)
+        user.cache_version = version
+        return user
+
+
+user_cache = UserCache(maxsize=getattr(settings, "USER_CACHE_SIZE", 10_000))
+
+
+@receiver(post_save, sender=User, dispatch_uid="user_cache_bump_on_save")
+@receiver(post_delete, sender=User, dispatch_uid="user_cache_bump_on_delete")
+def _user_changed(sender, instance, using, **kwargs):
+    # After commit, so nobody can cache the pre-commit row under the new version
+    transaction.on_commit(lambda: user_cache.bump(instance.pk), using=using)
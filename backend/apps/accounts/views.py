@@ -1,15 +1,11 @@
-from datetime import timedelta
-
-import requests
 from django.conf import settings
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.db import transaction
 from django.utils import timezone
-from django.utils.crypto import get_random_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.utils.decorators import method_decorator
-from django.utils.html import strip_tags
+from django.utils.http import http_date
 from django_ratelimit.decorators import ratelimit
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -18,6 +14,9 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .emails import QueuedEmail, queue_email, queue_emails
+from .login_throttle import get_login_throttle
+from .recaptcha import verify_recaptcha
 from .security_utils import (
     check_and_notify_new_device,
     get_client_ip,
@@ -26,9 +25,21 @@ from .security_utils import (
     track_login_attempt,
 )
 from .serializers import LoginSerializer, RegisterSerializer, UserSerializer
+from .tokens import (
+    EMAIL_VERIFICATION,
+    PASSWORD_RESET,
+    ExpiredTokenError,
+    InvalidTokenError,
+    check_token,
+    make_token,
+)
+from .user_cache import user_cache
 
 User = get_user_model()
 
+# Failed attempts before reCAPTCHA is required (lockout policy is in login_throttle)
+RECAPTCHA_AFTER_FAILURES = 2
+
 # Utilities -------------------------------------------------------------------
 
 def set_auth_cookies(response, tokens):
@@ -50,6 +61,11 @@ def clear_auth_cookies(response):
     return response
 
 
+def complete_login(user, request):
+    """Record a successful login and return a fresh token pair (used by the async views)."""
+    track_login_attempt(user, request, success=True)
+    refresh = RefreshToken.for_user(user)
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
 
 # Authentication Views --------------------------------------------------------
@@ -62,9 +78,14 @@ class RegisterView(APIView):
     def post(self, request):
         # Verify reCAPTCHA
         recaptcha_token = request.data.get("recaptcha_token")
-        is_valid, score = verify_recaptcha(recaptcha_token, action="register")
+        is_valid, score = verify_recaptcha(
+            recaptcha_token,
+            action="register",
+            remote_ip=get_client_ip(request),
+            email=request.data.get("email"),
+        )
 
-        if not is_valid or score < 0.5:
+        if not is_valid or score < settings.RECAPTCHA_REQUIRED_SCORE:
             return Response(
                 {
                     "detail": "reCAPTCHA verification failed. Please try again.",
@@ -75,28 +96,19 @@ class RegisterView(APIView):
 
         serializer = RegisterSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
 
-        token = get_random_string(64)
-        user.verification_token = token
-        user.verification_token_created = timezone.now()
-        user.save(update_fields=["verification_token", "verification_token_created"])
+        with transaction.atomic():
+            user = serializer.save()
 
-        verification_url = f"{settings.FRONTEND_URL.rstrip('/')}/verify-email/{token}"
+            token = make_token(user, EMAIL_VERIFICATION)
+            verification_url = f"{settings.FRONTEND_URL.rstrip('/')}/verify-email/{token}"
 
-        html_message = render_to_string("accounts/verify_email.html", {
-            "user": user,
-            "verification_url": verification_url,
-        })
-        plain_message = strip_tags(html_message)
-
-        send_mail(
-            subject="Verify your Valunds account",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-        )
+            queue_email(
+                "accounts/verify_email",
+                {"user": user, "verification_url": verification_url},
+                subject="Verify your Valunds account",
+                recipient=user.email,
+            )
 
         return Response(
             {
@@ -109,7 +121,14 @@ class RegisterView(APIView):
 
 @method_decorator(ratelimit(key='ip', rate='5/15m', method='POST'), name='dispatch')
 class LoginView(APIView):
-    """Email/password login with adaptive reCAPTCHA and device tracking."""
+    """
+    Email/password login with adaptive reCAPTCHA and device tracking.
+
+    The user row is fetched once and every stage (reCAPTCHA, lock, password,
+    verification) runs against that object. Failure counting and lockout are
+    delegated to the configured login throttle, which in production keeps
+    them in Redis so failed attempts don't write to the users table.
+    """
     permission_classes = [AllowAny]
 
     def post(self, request):
@@ -119,53 +138,54 @@ class LoginView(APIView):
         email = serializer.validated_data["email"]
         password = serializer.validated_data["password"]
 
-        # Pre-auth checks: reCAPTCHA trigger and lock handling
-        try:
-            user = User.objects.get(email=email)
+        user = User.objects.filter(email=email).first()
 
-            if getattr(user, "failed_login_attempts", 0) >= 2:
-                recaptcha_token = request.data.get("recaptcha_token")
-                is_valid, score = verify_recaptcha(recaptcha_token, action="login")
-
-                if not is_valid or score < 0.5:
-                    return Response(
-                        {
-                            "detail": "reCAPTCHA verification required after multiple failed attempts.",
-                            "code": "recaptcha_required",
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-            if user.account_locked_until and timezone.now() < user.account_locked_until:
-                time_remaining = (user.account_locked_until - timezone.now()).total_seconds() / 60
+        if user is None:
+            # Run the hasher anyway so response time doesn't reveal unknown emails
+            User().set_password(password)
+            return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        now = timezone.now()
+        throttle = get_login_throttle()
+        state = throttle.status(user, now)
+
+        if state.locked_until and now >= state.locked_until:
+            state = throttle.clear_expired_lock(user, now)
+
+        if state.failures >= RECAPTCHA_AFTER_FAILURES:
+            recaptcha_token = request.data.get("recaptcha_token")
+            is_valid, score = verify_recaptcha(
+                recaptcha_token,
+                action="login",
+                remote_ip=get_client_ip(request),
+                email=email,
+            )
+
+            if not is_valid or score < settings.RECAPTCHA_REQUIRED_SCORE:
                 return Response(
                     {
-                        "detail": f"Account temporarily locked due to too many failed login attempts. Try again in {int(time_remaining)} minutes.",
-                        "code": "account_locked",
-                        "locked_until": user.account_locked_until.isoformat(),
+                        "detail": "reCAPTCHA verification required after multiple failed attempts.",
+                        "code": "recaptcha_required",
                     },
-                    status=status.HTTP_403_FORBIDDEN,
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if user.account_locked_until and timezone.now() >= user.account_locked_until:
-                user.account_locked_until = None
-                user.failed_login_attempts = 0
-                user.save(update_fields=["account_locked_until", "failed_login_attempts"])
-
-        except User.DoesNotExist:
-            pass
-
-        # Authenticate
-        user = authenticate(username=email, password=password)
-
-        if not user:
-            try:
-                failed_user = User.objects.get(email=email)
-                track_login_attempt(failed_user, request, success=False)
-            except User.DoesNotExist:
-                pass
+        if state.locked_until and now < state.locked_until:
+            time_remaining = (state.locked_until - now).total_seconds() / 60
+            return Response(
+                {
+                    "detail": f"Account temporarily locked due to too many failed login attempts. Try again in {int(time_remaining)} minutes.",
+                    "code": "account_locked",
+                    "locked_until": state.locked_until.isoformat(),
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
-            self._handle_failed_login(email)
+        if not user.check_password(password):
+            track_login_attempt(user, request, success=False)
+            state, newly_locked = throttle.record_failure(user, now)
+            if newly_locked:
+                self._send_lockout_notification(user, state.locked_until)
             return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
         if not user.email_verified:
@@ -178,12 +198,13 @@ class LoginView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        if getattr(user, "failed_login_attempts", 0) > 0 or getattr(user, "last_failed_login", None):
-            user.failed_login_attempts = 0
-            user.last_failed_login = None
-            user.save(update_fields=["failed_login_attempts", "last_failed_login"])
+        if not user.is_active:
+            return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        # Any lockout columns to clear ride along with the last-login UPDATE
+        reset_fields = throttle.reset(user)
 
-        login_history = track_login_attempt(user, request, success=True)
+        login_history = track_login_attempt(user, request, success=True, update_fields=reset_fields)
         if login_history:
             check_and_notify_new_device(user, login_history)
 
@@ -194,41 +215,13 @@ class LoginView(APIView):
 
         return set_auth_cookies(response, tokens)
 
-    def _handle_failed_login(self, email):
-        """Increment failed attempts and lock account if threshold reached."""
-        try:
-            user = User.objects.get(email=email)
-
-            if user.last_failed_login and (timezone.now() - user.last_failed_login).total_seconds() > 900:
-                user.failed_login_attempts = 0
-
-            user.failed_login_attempts += 1
-            user.last_failed_login = timezone.now()
-
-            if user.failed_login_attempts >= 5:
-                user.account_locked_until = timezone.now() + timedelta(minutes=15)
-                user.save(update_fields=["failed_login_attempts", "last_failed_login", "account_locked_until"])
-                self._send_lockout_notification(user)
-            else:
-                user.save(update_fields=["failed_login_attempts", "last_failed_login"])
-
-        except User.DoesNotExist:
-            pass
-
-    def _send_lockout_notification(self, user):
+    def _send_lockout_notification(self, user, locked_until):
         """Notify user when account is locked."""
-        html_message = render_to_string("accounts/account_locked.html", {
-            "user": user,
-            "locked_until": user.account_locked_until
-        })
-        plain_message = strip_tags(html_message)
-
-        send_mail(
+        queue_email(
+            "accounts/account_locked",
+            {"user": user, "locked_until": locked_until},
             subject="Your Valunds account has been temporarily locked",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
+            recipient=user.email,
         )
 
 
@@ -283,12 +276,38 @@ class RefreshTokenView(APIView):
             )
 
 
+def profile_validators(user) -> tuple[str, int]:
+    """ETag and Last-Modified (epoch seconds) of a user's profile, from their cache version."""
+    version = getattr(user, "cache_version", None) or user_cache.version(user.pk)
+    return f'"{user.pk}-{version}"', version // 1_000_000_000
+
+
+def set_profile_validators(response, etag: str, last_modified: int):
+    """Let the browser cache the profile but revalidate it on every use."""
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Authorization", "Cookie"])
+    return response
+
+
 class MeView(APIView):
-    """Return current authenticated user."""
+    """
+    Return current authenticated user.
+
+    Conditional GETs are answered from the user's cache version: an
+    unchanged profile gets ``304 Not Modified`` without serializing anything.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response(UserSerializer(request.user).data)
+        etag, last_modified = profile_validators(request.user)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return set_profile_validators(not_modified, etag, last_modified)
+
+        response = Response(UserSerializer(request.user).data)
+        return set_profile_validators(response, etag, last_modified)
 
 
 @method_decorator(ratelimit(key='ip', rate='5/h', method='POST'), name='dispatch')
@@ -302,8 +321,10 @@ class VerifyEmailView(APIView):
             return Response({"detail": "Missing token"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            user = User.objects.get(verification_token=token)
-        except User.DoesNotExist:
+            user = check_token(token, EMAIL_VERIFICATION)
+        except ExpiredTokenError:
+            return Response({"detail": "Verification link expired"}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTokenError:
             return Response({"detail": "Invalid verification token"}, status=status.HTTP_400_BAD_REQUEST)
 
         if user.email_verified:
@@ -312,16 +333,9 @@ class VerifyEmailView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not user.verification_token_created or (
-            timezone.now() - user.verification_token_created > timedelta(hours=1)
-        ):
-            return Response({"detail": "Verification link expired"}, status=status.HTTP_400_BAD_REQUEST)
-
         user.email_verified = True
         user.is_active = True
-        user.verification_token = None
-        user.verification_token_created = None
-        user.save(update_fields=["email_verified", "is_active", "verification_token", "verification_token_created"])
+        user.save(update_fields=["email_verified", "is_active"])
 
         refresh = RefreshToken.for_user(user)
         tokens = {"refresh": str(refresh), "access": str(refresh.access_token)}
@@ -334,14 +348,34 @@ class VerifyEmailView(APIView):
 
 
 class UpdateProfileView(APIView):
-    """Update current user's profile."""
+    """
+    Update current user's profile.
+
+    With ``If-Match: <ETag from me/>`` the update only applies if the profile
+    hasn't changed since, so concurrent tabs get ``412 Precondition Failed``
+    instead of silently overwriting each other.
+    """
     permission_classes = [IsAuthenticated]
 
     def patch(self, request):
-        serializer = UserSerializer(request.user, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data)
+        with transaction.atomic():
+            user = User.objects.select_for_update().get(pk=request.user.pk)
+
+            etag, last_modified = profile_validators(user)
+            precondition_failed = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if precondition_failed is not None:
+                return precondition_failed
+
+            serializer = UserSerializer(user, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+            # Move the version while the row is still locked, so a PATCH waiting
+            # on the lock with the same If-Match fails; the commit hook bumps again
+            user_cache.bump(user.pk)
+
+        response = Response(serializer.data)
+        return set_profile_validators(response, *profile_validators(user))
 
 
 class ChangePasswordView(APIView):
@@ -365,10 +399,13 @@ class ChangePasswordView(APIView):
 
         ip_address = get_client_ip(request)
 
-        request.user.set_password(new)
-        request.user.save()
+        with transaction.atomic():
+            request.user.set_password(new)
+            # Only the changed column: the rest of request.user may be a cached
+            # snapshot, and writing it back could undo a lock set since
+            request.user.save(update_fields=["password"])
 
-        send_password_change_notification(request.user, ip_address)
+            send_password_change_notification(request.user, ip_address)
 
         refresh = RefreshToken.for_user(request.user)
 
@@ -396,28 +433,22 @@ class ChangeEmailView(APIView):
             )
 
         old_email = request.user.email
-        token = get_random_string(64)
-        request.user.email = new_email
-        request.user.email_verified = False
-        request.user.verification_token = token
-        request.user.verification_token_created = timezone.now()
-        request.user.save()
-
-        send_email_change_notification(request.user, old_email, new_email)
-
-        verification_url = f"{settings.FRONTEND_URL.rstrip('/')}/verify-email/{token}"
-        html_message = render_to_string('accounts/verify_email.html', {
-            'user': request.user,
-            'verification_url': verification_url,
-        })
-        plain_message = strip_tags(html_message)
-        send_mail(
-            subject="Verify your new Valunds email address",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[new_email],
-            html_message=html_message,
-        )
+
+        with transaction.atomic():
+            request.user.email = new_email
+            request.user.email_verified = False
+            request.user.save(update_fields=["email", "email_verified"])
+
+            send_email_change_notification(request.user, old_email, new_email)
+
+            token = make_token(request.user, EMAIL_VERIFICATION)
+            verification_url = f"{settings.FRONTEND_URL.rstrip('/')}/verify-email/{token}"
+            queue_email(
+                'accounts/verify_email',
+                {'user': request.user, 'verification_url': verification_url},
+                subject="Verify your new Valunds email address",
+                recipient=new_email,
+            )
 
         return Response({"detail": "Verification email sent to new address. Security notification sent to old address."})
 
@@ -436,7 +467,7 @@ class DeleteAccountView(APIView):
             )
 
         request.user.is_active = False  # Soft delete
-        request.user.save()
+        request.user.save(update_fields=["is_active"])
 
         response = Response({"detail": "Account deleted"})
         return clear_auth_cookies(response)
@@ -459,28 +490,24 @@ class RequestPasswordResetView(APIView):
         try:
             user = User.objects.get(email=email)
 
-            token = get_random_string(64)
-            user.password_reset_token = token
-            user.password_reset_token_created = timezone.now()
-            user.save(update_fields=['password_reset_token', 'password_reset_token_created'])
-
+            token = make_token(user, PASSWORD_RESET)
             reset_url = f"{settings.FRONTEND_URL.rstrip('/')}/reset-password/{token}"
 
-            html_message = render_to_string('accounts/reset_password_email.html', {
-                'user': user,
-                'reset_url': reset_url,
-            })
-            plain_message = strip_tags(html_message)
-
-            send_mail(
-                subject="Reset your Valunds password",
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                html_message=html_message,
-            )
-
-            self._send_security_notification(user)
+            # Reset link and security notice go out together over one SMTP session
+            queue_emails([
+                QueuedEmail(
+                    'accounts/reset_password_email',
+                    {'user': user, 'reset_url': reset_url},
+                    subject="Reset your Valunds password",
+                    recipient=user.email,
+                ),
+                QueuedEmail(
+                    'accounts/password_reset_notification',
+                    {'user': user},
+                    subject="Password reset requested for your Valunds account",
+                    recipient=user.email,
+                ),
+            ])
 
         except User.DoesNotExist:
             pass
@@ -490,21 +517,6 @@ class RequestPasswordResetView(APIView):
             status=status.HTTP_200_OK
         )
 
-    def _send_security_notification(self, user):
-        """Notify user that a password reset was requested."""
-        html_message = render_to_string('accounts/password_reset_notification.html', {
-            'user': user,
-        })
-        plain_message = strip_tags(html_message)
-
-        send_mail(
-            subject="Password reset requested for your Valunds account",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-        )
-
 
 @method_decorator(ratelimit(key='ip', rate='5/h', method='POST'), name='dispatch')
 class ResetPasswordView(APIView):
@@ -522,18 +534,15 @@ class ResetPasswordView(APIView):
             )
 
         try:
-            user = User.objects.get(password_reset_token=token)
-        except User.DoesNotExist:
+            user = check_token(token, PASSWORD_RESET)
+        except ExpiredTokenError:
             return Response(
-                {"detail": "Invalid or expired reset token"},
+                {"detail": "Reset link has expired. Please request a new one."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        if not user.password_reset_token_created or (
-            timezone.now() - user.password_reset_token_created > timedelta(hours=1)
-        ):
+        except InvalidTokenError:
             return Response(
-                {"detail": "Reset link has expired. Please request a new one."},
+                {"detail": "Invalid or expired reset token"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
@@ -547,14 +556,13 @@ class ResetPasswordView(APIView):
 
         ip_address = get_client_ip(request)
 
-        user.set_password(new_password)
-        user.password_reset_token = None
-        user.password_reset_token_created = None
-        user.failed_login_attempts = 0
-        user.account_locked_until = None
-        user.save()
+        with transaction.atomic():
+            # Changing the password also invalidates the reset token
+            user.set_password(new_password)
+            get_login_throttle().reset(user)
+            user.save()
 
-        send_password_change_notification(user, ip_address)
+            send_password_change_notification(user, ip_address)
 
         return Response(
             {"detail": "Password successfully reset. You can now log in with your new password."},
@@ -585,25 +593,14 @@ class ResendVerificationView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            token = get_random_string(64)
-            user.verification_token = token
-            user.verification_token_created = timezone.now()
-            user.save(update_fields=['verification_token', 'verification_token_created'])
-
+            token = make_token(user, EMAIL_VERIFICATION)
             verification_url = f"{settings.FRONTEND_URL.rstrip('/')}/verify-email/{token}"
 
-            html_message = render_to_string('accounts/verify_email.html', {
-                'user': user,
-                'verification_url': verification_url,
-            })
-            plain_message = strip_tags(html_message)
-
-            send_mail(
+            queue_email(
+                'accounts/verify_email',
+                {'user': user, 'verification_url': verification_url},
                 subject="Verify your Valunds account",
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                html_message=html_message,
+                recipient=user.email,
             )
 
         except User.DoesNotExist:
@@ -613,36 +610,3 @@ class ResendVerificationView(APIView):
             {"detail": "If an unverified account exists with this email, a new verification link has been sent."},
             status=status.HTTP_200_OK
         )
-
-
-def verify_recaptcha(token: str, action: str = None) -> tuple[bool, float]:
-    """Verify reCAPTCHA v3 token; returns (is_valid, score)."""
-    if not token:
-        return False, 0.0
-
-    try:
-        response = requests.post(
-            'https://www.google.com/recaptcha/api/siteverify',
-            data={
-                'secret': settings.RECAPTCHA_PRIVATE_KEY,
-                'response': token,
-            },
-            timeout=5
-        )
-
-        result = response.json()
-
-        if not result.get('success'):
-            return False, 0.0
-
-        score = result.get('score', 0.0)
-
-        if action and result.get('action') != action:
-            return False, 0.0
-
-        return True, score
-
-    except Exception as e:
-        print(f"reCAPTCHA verification error: {e}")
-        # Graceful degradation on verification service failure
-        return True, 1.0
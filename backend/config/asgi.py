@@ -1,6 +1,37 @@
+"""
+ASGI entry point.
+
+Runs as the ``backend_asgi`` service (gunicorn with uvicorn workers), which
+nginx routes long-lived requests to, such as the BankID status stream, so
+held connections don't occupy the sync workers serving the rest of the API.
+
+Django's handler only speaks HTTP, so the ASGI lifespan protocol is answered
+here: at start-up each worker opens its BankID connection on the event loop
+that will serve its requests.
+"""
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.config.settings")
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def lifespan(receive, send):
+    from backend.apps.accounts.bankid import warm_async_bankid_client
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await warm_async_bankid_client()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,19 @@
+"""
+Gunicorn settings for the Django backend.
+
+Used by the container image via ``gunicorn -c python:backend.config.gunicorn_conf``,
+and by the ``backend_asgi`` compose service, which runs the same app under
+uvicorn workers for the async views.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 3))
+accesslog = "-"
+
+
+def worker_exit(server, worker):
+    # Write the worker's buffered audit events before it goes away
+    from backend.apps.accounts.audit import audit_log
+
+    audit_log.flush()
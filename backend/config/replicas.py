@@ -0,0 +1,191 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+``ReplicaRouter`` sends reads made while serving a request to a healthy
+replica (``DATABASE_REPLICA_URLS``). Everything else goes to the primary:
+writes, reads inside a transaction, reads outside a request (Celery tasks,
+management commands), and reads in any request that has written or arrives
+within ``REPLICA_STICKY_SECONDS`` of a write by the same browser. The middleware
+tracks that window with a short-lived cookie, so a profile update followed by
+``GET /me/`` still reads the new data from the primary.
+
+Each process checks a replica at most every ``REPLICA_CHECK_INTERVAL``
+seconds. A replica that lags more than ``REPLICA_MAX_LAG`` seconds behind
+the primary, or whose WAL receiver isn't streaming, is skipped until its
+next check. One that cannot be reached is skipped for
+``REPLICA_RETRY_INTERVAL`` seconds, so a dead host costs one connect
+timeout per process per interval rather than one per check. With no
+healthy replica reads fall back to the primary.
+
+The status of the WAL receiver is only visible to roles with
+``pg_read_all_stats``; grant it to the application role on the replicas.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = "db_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Seconds behind the primary: zero when the replica has replayed everything it
+# received, NULL when it isn't receiving (no WAL receiver, or one that is
+# reconnecting), since it can't know how far the primary has moved on
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@dataclass
+class RequestState:
+    use_primary: bool = False
+    wrote: bool = False
+
+
+_request_state: ContextVar[RequestState | None] = ContextVar("replica_request_state", default=None)
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class ReplicaHealth:
+    """Per-process view of which replicas are reachable and caught up."""
+
+    def __init__(self):
+        self._healthy: dict[str, bool] = {}
+        self._next_check: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def healthy(self, aliases: list[str]) -> list[str]:
+        now = time.monotonic()
+        stale = [alias for alias in aliases if now >= self._next_check.get(alias, 0)]
+
+        if stale and self._lock.acquire(blocking=False):
+            # One thread refreshes; the others use the previous result meanwhile
+            try:
+                for alias in stale:
+                    self._healthy[alias], interval = self._check(alias)
+                    self._next_check[alias] = time.monotonic() + interval
+            finally:
+                self._lock.release()
+
+        return [alias for alias in aliases if self._healthy.get(alias, False)]
+
+    def _check(self, alias: str) -> tuple[bool, float]:
+        """Whether the replica is usable, and how long to keep that answer."""
+        max_lag = getattr(settings, "REPLICA_MAX_LAG", 5)
+        interval = getattr(settings, "REPLICA_CHECK_INTERVAL", 5)
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_QUERY)
+                lag = cursor.fetchone()[0]
+        except DatabaseError as e:
+            logger.warning(f"Replica {alias} unavailable, reading from primary: {e}")
+            connection.close()
+            return False, getattr(settings, "REPLICA_RETRY_INTERVAL", 30)
+
+        if lag is None:
+            logger.warning(f"Replica {alias} is not streaming WAL, reading from primary")
+            return False, interval
+        if float(lag) > max_lag:
+            logger.warning(f"Replica {alias} is {float(lag):.1f}s behind, reading from primary")
+            return False, interval
+        return True, interval
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """Route request reads to healthy replicas and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.use_primary or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        healthy = replica_health.healthy(replica_aliases())
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    """Track per-request write state and keep recent writers on the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _request_state.set(self._start(request))
+        try:
+            response = self.get_response(request)
+            return self._finish(response)
+        finally:
+            _request_state.reset(token)
+
+    async def __acall__(self, request):
+        token = _request_state.set(self._start(request))
+        try:
+            response = await self.get_response(request)
+            return self._finish(response)
+        finally:
+            _request_state.reset(token)
+
+    @staticmethod
+    def _start(request) -> RequestState:
+        return RequestState(
+            use_primary=request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES,
+        )
+
+    @staticmethod
+    def _finish(response):
+        state = _request_state.get()
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 10),
+                httponly=True,
+                secure=not settings.DEBUG,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,165 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection
+from django.http import HttpResponse
+
+from backend.config import replicas
+from backend.config.replicas import (
+    LAG_QUERY,
+    STICKY_COOKIE,
+    ReplicaHealth,
+    ReplicaRouter,
+    ReplicaStickinessMiddleware,
+)
+
+
+class StandInReplica:
+    """Answers the lag query with ``lag``, or fails to connect when ``lag`` is an exception."""
+
+    def __init__(self, lag):
+        self.lag = lag
+        self.checks = 0
+
+    def cursor(self):
+        self.checks += 1
+        if isinstance(self.lag, Exception):
+            raise self.lag
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql):
+        pass
+
+    def fetchone(self):
+        return (self.lag,)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def replica(monkeypatch, settings):
+    settings.REPLICA_MAX_LAG = 5
+    settings.REPLICA_CHECK_INTERVAL = 0
+    settings.REPLICA_RETRY_INTERVAL = 30
+    stand_in = StandInReplica(0)
+    monkeypatch.setattr(replicas, "connections", {"replica1": stand_in})
+    return stand_in
+
+
+def test_caught_up_replica_is_used(replica):
+    assert ReplicaHealth().healthy(["replica1"]) == ["replica1"]
+
+
+@pytest.mark.parametrize("lag", [None, 12.5], ids=["not-streaming", "lagging"])
+def test_replica_behind_or_not_receiving_is_skipped_until_the_next_check(replica, lag):
+    replica.lag = lag
+    health = ReplicaHealth()
+
+    assert health.healthy(["replica1"]) == []
+    health.healthy(["replica1"])
+    assert replica.checks == 2
+
+
+def test_unreachable_replica_is_not_retried_on_every_request(replica):
+    replica.lag = OperationalError("connection timeout expired")
+    health = ReplicaHealth()
+
+    for _ in range(5):
+        assert health.healthy(["replica1"]) == []
+    assert replica.checks == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="replicas are PostgreSQL streaming standbys")
+def test_lag_query_runs_on_postgresql():
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_QUERY)
+        # The test database is a primary, which is never behind itself
+        assert cursor.fetchone()[0] == 0
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """A healthy replica1 next to a primary that is outside any transaction."""
+    monkeypatch.setattr(replicas, "replica_aliases", lambda: ["replica1"])
+    monkeypatch.setattr(replicas, "connections", {DEFAULT_DB_ALIAS: SimpleNamespace(in_atomic_block=False)})
+    monkeypatch.setattr(replicas.replica_health, "healthy", lambda aliases: aliases)
+
+
+def view(write: bool = False):
+    """Records where the router sends a read, after a write if ``write``."""
+    router = ReplicaRouter()
+
+    def get_response(request):
+        if write:
+            router.db_for_write(None)
+        request.read_from = router.db_for_read(None)
+        return HttpResponse()
+
+    return get_response
+
+
+def async_view(write: bool = False):
+    sync_view = view(write)
+
+    async def get_response(request):
+        return sync_view(request)
+
+    return get_response
+
+
+def test_reads_outside_a_request_use_the_primary(routed):
+    assert ReplicaRouter().db_for_read(None) == DEFAULT_DB_ALIAS
+
+
+def test_request_reads_use_a_replica(routed, rf):
+    request = rf.get("/")
+
+    response = ReplicaStickinessMiddleware(view())(request)
+
+    assert request.read_from == "replica1"
+    assert STICKY_COOKIE not in response.cookies
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_writes_pin_the_request_and_the_browser_to_the_primary(routed, rf, method):
+    request = getattr(rf, method)("/")
+
+    response = ReplicaStickinessMiddleware(view(write=True))(request)
+
+    assert request.read_from == DEFAULT_DB_ALIAS
+    assert response.cookies[STICKY_COOKIE]["max-age"] == 10
+
+
+def test_reads_after_a_recent_write_use_the_primary(routed, rf):
+    rf.cookies[STICKY_COOKIE] = "1"
+    request = rf.get("/")
+
+    ReplicaStickinessMiddleware(view())(request)
+
+    assert request.read_from == DEFAULT_DB_ALIAS
+
+
+@pytest.mark.parametrize("write, cookie, read_from", [
+    (False, False, "replica1"),
+    (True, False, DEFAULT_DB_ALIAS),
+    (False, True, DEFAULT_DB_ALIAS),
+], ids=["read", "write", "sticky"])
+def test_async_requests_are_routed_the_same(routed, rf, write, cookie, read_from):
+    if cookie:
+        rf.cookies[STICKY_COOKIE] = "1"
+    request = rf.get("/")
+    middleware = ReplicaStickinessMiddleware(async_view(write))
+
+    response = asyncio.run(middleware(request))
+
+    assert request.read_from == read_from
+    assert (STICKY_COOKIE in response.cookies) == write
@@ -31,6 +31,15 @@ export const setAccessToken = (token: string | null): void => {
 
 export const getAccessToken = (): string | null => ACCESS_TOKEN;
 
+/* Profile version (ETag of me/), sent as If-Match with profile updates */
+let PROFILE_ETAG: string | null = null;
+
+export const setProfileETag = (etag: string | null): void => {
+  PROFILE_ETAG = etag;
+};
+
+export const getProfileETag = (): string | null => PROFILE_ETAG;
+
 /* Request Interceptor */
 authClient.interceptors.request.use((config) => {
   if (ACCESS_TOKEN && config.headers) {
@@ -117,8 +126,9 @@ const authApi = {
 
   async getCurrentUser(): Promise<User | null> {
     try {
-      const { data } = await authClient.get<User>("me/");
-      return data;
+      const response = await authClient.get<User>("me/");
+      setProfileETag(response.headers.etag ?? null);
+      return response.data;
     } catch (error) {
       if (axios.isAxiosError(error) && error.response?.status === 401) {
         setAccessToken(null);
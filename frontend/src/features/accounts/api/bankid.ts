@@ -2,6 +2,7 @@ import type {
   BankIDCollectResponse,
   BankIDInitiateRequest,
   BankIDInitiateResponse,
+  BankIDQRFrame,
 } from "@/features/accounts/types/bankid";
 import { useMutation, useQueryClient } from "@tanstack/react-query";
 import axios from "axios";
@@ -43,8 +44,35 @@ const bankidApi = {
   async cancel(): Promise<void> {
     await bankidClient.post("cancel/");
   },
+
+  /** Upcoming QR frames, one per second, generated by the server */
+  async qrFrames(count = 5): Promise<BankIDQRFrame[]> {
+    const { data } = await bankidClient.get<{ frames: BankIDQRFrame[] }>(
+      "qr/",
+      { params: { count } }
+    );
+    return data.frames;
+  },
+
+  /** Server-Sent Events stream of one QR frame per second */
+  openQRStream(): EventSource {
+    return new EventSource(`${bankidClient.defaults.baseURL}qr/`, {
+      withCredentials: true,
+    });
+  },
+
+  /** Server-Sent Events stream of status/hint changes for the active order */
+  openStatusStream(): EventSource {
+    return new EventSource(`${bankidClient.defaults.baseURL}status/`, {
+      withCredentials: true,
+    });
+  },
 };
 
+export const openBankIDStatusStream = bankidApi.openStatusStream;
+export const openBankIDQRStream = bankidApi.openQRStream;
+export const fetchBankIDQRFrames = bankidApi.qrFrames;
+
 /* React Query Hooks */
 export const useBankIDInitiate = () => {
   return useMutation({
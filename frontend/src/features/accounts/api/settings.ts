@@ -1,7 +1,7 @@
 import { useMutation, useQueryClient } from "@tanstack/react-query";
 import axios from "axios";
 import { toast } from "react-hot-toast";
-import { getAccessToken } from "./auth";
+import { getAccessToken, getProfileETag, setProfileETag } from "./auth";
 
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
@@ -24,14 +24,24 @@ export const useUpdateProfile = () => {
 
   return useMutation({
     mutationFn: async (data: any) => {
-      const response = await settingsClient.patch("profile/", data);
+      const etag = getProfileETag();
+      const response = await settingsClient.patch("profile/", data, {
+        headers: etag ? { "If-Match": etag } : undefined,
+      });
+      setProfileETag(response.headers.etag ?? null);
       return response.data;
     },
     onSuccess: (data) => {
       queryClient.setQueryData(["auth", "me"], data);
       toast.success("Profile updated successfully");
     },
-    onError: () => {
+    onError: (error: any) => {
+      if (error.response?.status === 412) {
+        // Changed in another tab since we loaded it; show the current version
+        void queryClient.invalidateQueries({ queryKey: ["auth", "me"] });
+        toast.error("Your profile was changed elsewhere. Please review and save again.");
+        return;
+      }
       toast.error("Failed to update profile");
     },
   });
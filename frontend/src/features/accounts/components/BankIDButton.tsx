@@ -1,5 +1,6 @@
 import bankIdLogo from "@/assets/images/bank-id.webp";
 import {
+  openBankIDStatusStream,
   useBankIDCancel,
   useBankIDCollect,
   useBankIDInitiate,
@@ -7,6 +8,7 @@ import {
 import type {
   BankIDInitiateResponse,
   BankIDStatus,
+  BankIDStatusEvent,
 } from "@/features/accounts/types/bankid";
 import { Button } from "@/shared/components/ui/Button";
 import { useNavigate } from "@tanstack/react-router";
@@ -60,19 +62,21 @@ export const BankIDButton: React.FC<BankIDButtonProps> = ({
   }, [initiateMutation]);
 
   /**
-   * Step 2: Poll for completion every 2 seconds
+   * Step 2: Follow status changes over one held connection; the server
+   * collects from BankID, and we only call collect once to log in
    */
   useEffect(() => {
     if (status !== "pending" || !sessionData) return;
 
-    const pollInterval = setInterval(async () => {
+    const stream = openBankIDStatusStream();
+
+    const completeLogin = async () => {
       try {
         const result = await collectMutation.mutateAsync();
 
         if (result.status === "complete") {
           setStatus("complete");
           setMessage("Autentisering lyckades! ✓");
-          clearInterval(pollInterval);
 
           // Redirect after brief delay
           setTimeout(() => {
@@ -82,22 +86,42 @@ export const BankIDButton: React.FC<BankIDButtonProps> = ({
               void navigate({ to: "/dashboard" });
             }
           }, 1500);
-        } else if (result.status === "failed") {
+        } else {
           setStatus("failed");
           setMessage("BankID-autentisering misslyckades");
-          clearInterval(pollInterval);
-        } else if (result.status === "pending") {
-          // Use backend's user-friendly messages (Guideline #12)
-          setMessage(result.message || "Väntar på BankID...");
         }
       } catch (error) {
         setStatus("failed");
         setMessage("Ett fel uppstod vid autentisering");
-        clearInterval(pollInterval);
       }
-    }, 2000);
+    };
+
+    stream.addEventListener("status", (event) => {
+      const update = JSON.parse((event as MessageEvent).data) as BankIDStatusEvent;
+
+      if (update.status === "complete") {
+        stream.close();
+        void completeLogin();
+      } else if (update.status === "failed") {
+        stream.close();
+        setStatus("failed");
+        setMessage("BankID-autentisering misslyckades");
+      } else {
+        // Use backend's user-friendly messages (Guideline #12)
+        setMessage(update.message || "Väntar på BankID...");
+      }
+    });
+
+    stream.addEventListener("error", (event) => {
+      // Server-sent error events carry data; plain connection drops are retried by EventSource
+      if ((event as MessageEvent).data || stream.readyState === EventSource.CLOSED) {
+        stream.close();
+        setStatus("failed");
+        setMessage("Ett fel uppstod vid autentisering");
+      }
+    });
 
-    return () => clearInterval(pollInterval);
+    return () => stream.close();
   }, [status, sessionData, collectMutation, navigate, onSuccess]);
 
   /**
@@ -9,8 +9,12 @@ export interface BankIDInitiateRequest {
 export interface BankIDInitiateResponse {
   orderRef: string;
   autoStartToken: string;
-  qrStartToken?: string;
-  qrStartSecret?: string;
+}
+
+// One animated QR code frame, valid for the given second of the order
+export interface BankIDQRFrame {
+  time: number;
+  data: string;
 }
 
 export interface BankIDCollectResponse {
@@ -21,6 +25,14 @@ export interface BankIDCollectResponse {
   tokens?: Tokens; // ✅ Reuse shared Tokens type
 }
 
+// Event payload from the bankid/status/ stream
+export interface BankIDStatusEvent {
+  status: "pending" | "complete" | "failed";
+  hintCode: string | null;
+  message: string;
+  version: number;
+}
+
 export type BankIDStatus =
   | "idle"
   | "initializing"